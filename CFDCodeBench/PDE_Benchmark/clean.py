@@ -17,7 +17,8 @@ def make_clean(root_dir):
         "compare_images",
         "table",
         "image",
-        "convergent"
+        "convergent",
+        "cache"
     ]
 
     print("🧹 Cleaning generated folders...\n")
@@ -0,0 +1,512 @@
+import re
+import sys
+import json
+import math
+import time
+import zlib
+import base64
+import struct
+import random
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Solver returned when no canned code is given: saves a smooth field for every variable the prompt asks for
+DEFAULT_SOLVER_CODE = """import numpy as np
+
+nx = 101
+x = np.linspace(0, 1, nx)
+{saves}
+"""
+
+
+def get_requested_variables(prompt):
+    # Variables listed after "**Save the following variables** at the final time step:" (see generate_prompt)
+    match = re.search(r"\*\*Save the following variables\*\* at the final time step:\s*\n(.+)", prompt)
+    if not match:
+        return ["u"]
+    variables = [v.strip(" `") for v in match.group(1).split(",")]
+    return [v for v in variables if v.isidentifier()] or ["u"]
+
+
+def default_solver_code(prompt):
+    saves = "\n".join(f"{var} = np.sin(np.pi * x)\nnp.save('{var}.npy', {var})"
+                      for var in get_requested_variables(prompt))
+    return DEFAULT_SOLVER_CODE.format(saves=saves)
+
+
+def parse_latency(spec):
+    # Latency of the responses in seconds: "fixed:<s>", "uniform:<min>:<max>", "lognormal:<median>:<sigma>" or the
+    # same as a tuple, e.g. ("uniform", 1, 5)
+    if isinstance(spec, (int, float)):
+        return ("fixed", float(spec))
+    if isinstance(spec, str):
+        name, *params = spec.split(":")
+        spec = (name, *map(float, params))
+    if spec[0] not in ("fixed", "uniform", "lognormal"):
+        raise ValueError(f"Unsupported latency distribution: {spec[0]}")
+    return tuple(spec)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def encode_event_message(headers, payload):
+    # One frame of the AWS event stream encoding used by invoke_model_with_response_stream (string headers only)
+    header_bytes = b"".join(
+        struct.pack(">B", len(name)) + name.encode() + struct.pack(">BH", 7, len(value)) + value.encode()
+        for name, value in headers.items())
+    prelude = struct.pack(">II", 12 + len(header_bytes) + len(payload) + 4, len(header_bytes))
+    message = prelude + struct.pack(">I", zlib.crc32(prelude)) + header_bytes + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+
+class MockLLMServer:
+    # Local OpenAI / Bedrock / Gemini endpoints for load-testing the harness offline (set MOCK_LLM_URL to its url):
+    # canned solver_code after a random latency, optional errors / throttling, streaming and batch jobs
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                 requests_per_minute=None, solver_code=None, seed=None, trailing_text="", chunk_size=64,
+                 chunk_delay=0.0, batch_delay=0.0):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.requests_per_minute = requests_per_minute
+        self.solver_code = solver_code
+        self.trailing_text = trailing_text
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.batch_delay = batch_delay
+        # Uploaded files and batches of the OpenAI Batch API, S3 objects and Bedrock batch inference jobs
+        self.files, self.batches, self.objects, self.jobs = {}, {}, {}, {}
+        self.random = random.Random(seed)
+        self.request_times = []
+        self.stats = {"requests": 0, "responses": 0, "errors": 0, "throttled": 0, "cancelled": 0, "batch_records": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def sample_latency(self):
+        name, *params = self.latency
+        with self._lock:
+            if name == "fixed":
+                return params[0]
+            if name == "uniform":
+                return self.random.uniform(params[0], params[1])
+            return self.random.lognormvariate(math.log(params[0]), params[1])
+
+    def draw_failure(self):
+        # None, "throttled" or "error" for the next request
+        with self._lock:
+            now = time.monotonic()
+            if self.requests_per_minute:
+                self.request_times = [t for t in self.request_times if now - t < 60]
+                if len(self.request_times) >= self.requests_per_minute:
+                    return "throttled"
+                self.request_times.append(now)
+            draw = self.random.random()
+        if draw < self.throttle_rate:
+            return "throttled"
+        if draw < self.throttle_rate + self.error_rate:
+            return "error"
+        return None
+
+    def draw_record_failure(self):
+        # Failure of one batch record: batch jobs are not throttled per request, their records fail instead
+        with self._lock:
+            draw = self.random.random()
+        return draw < self.throttle_rate + self.error_rate
+
+    def new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}{self.random.getrandbits(48):012x}"
+
+    def completion_text(self, prompt):
+        if callable(self.solver_code):
+            code = self.solver_code(prompt)
+        elif self.solver_code is not None:
+            code = self.solver_code
+        else:
+            code = default_solver_code(prompt)
+        return f"```python\n{code.strip()}\n```{self.trailing_text}"
+
+    def chunks(self, text):
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_stream(self, content_type, frames):
+                # Chunked transfer encoding, like the providers, so the clients get every frame as it is sent
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for frame in frames:
+                        self.wfile.write(f"{len(frame):x}\r\n".encode() + frame + b"\r\n")
+                        self.wfile.flush()
+                        time.sleep(server.chunk_delay)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled the stream
+                    server.count("cancelled")
+
+            def read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_POST(self):
+                body = self.read_body()
+                path = unquote(self.path.split("?", 1)[0])
+                if path == "/v1/files":
+                    self.create_file(body)
+                    return
+                try:
+                    request = json.loads(body or b"{}")
+                except ValueError:
+                    self.send_json(400, {"error": {"message": "Invalid JSON body"}})
+                    return
+                if path == "/v1/batches":
+                    self.create_openai_batch(request)
+                    return
+                if path == "/model-invocation-job":
+                    self.create_bedrock_job(request)
+                    return
+                if path.endswith("/chat/completions"):
+                    provider = "openai_stream" if request.get("stream") else "openai"
+                elif path.startswith("/model/") and path.endswith("/invoke"):
+                    provider = "bedrock"
+                elif path.startswith("/model/") and path.endswith("/invoke-with-response-stream"):
+                    provider = "bedrock_stream"
+                elif path.endswith(":generateContent"):
+                    provider = "gemini"
+                elif path.endswith(":streamGenerateContent"):
+                    provider = "gemini_stream"
+                else:
+                    self.send_json(404, {"error": {"message": f"Unknown endpoint {path}"}})
+                    return
+
+                server.count("requests")
+                time.sleep(server.sample_latency())
+                failure = server.draw_failure()
+                if failure is not None:
+                    server.count("throttled" if failure == "throttled" else "errors")
+                    self.send_failure(provider, failure)
+                    return
+                server.count("responses")
+                if provider.endswith("_stream"):
+                    getattr(self, provider)(request, path)
+                else:
+                    self.send_json(200, getattr(self, f"{provider}_response")(request, path))
+
+            def send_failure(self, provider, failure):
+                status = 429 if failure == "throttled" else 500
+                if provider.startswith("openai"):
+                    error_type = "rate_limit_exceeded" if failure == "throttled" else "server_error"
+                    self.send_json(status, {"error": {"message": f"Mock {failure}", "type": error_type}})
+                elif provider.startswith("bedrock"):
+                    error_type = "ThrottlingException" if failure == "throttled" else "InternalServerException"
+                    self.send_json(status, {"message": f"Mock {failure}"}, {"x-amzn-ErrorType": f"{error_type}:"})
+                else:
+                    error_status = "RESOURCE_EXHAUSTED" if failure == "throttled" else "INTERNAL"
+                    self.send_json(status, {"error": {"code": status, "message": f"Mock {failure}",
+                                                      "status": error_status}})
+
+            def openai_response(self, request, path):
+                prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+                text = server.completion_text(prompt)
+                input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+                return {
+                    "id": f"chatcmpl-mock-{server.random.getrandbits(32):08x}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "mock"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                              "total_tokens": input_tokens + output_tokens},
+                }
+
+            def bedrock_response(self, request, path):
+                prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+                text = server.completion_text(prompt)
+                return {
+                    "id": f"msg_mock_{server.random.getrandbits(32):08x}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": path[len("/model/"):-len("/invoke")],
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn",
+                    "usage": {"input_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(text)},
+                }
+
+            def gemini_response(self, request, path):
+                contents = request.get("contents", [])
+                if isinstance(contents, str):
+                    prompt = contents
+                else:
+                    prompt = "\n".join(part.get("text", "") for content in contents
+                                       for part in content.get("parts", []))
+                text = server.completion_text(prompt)
+                input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+                return {
+                    "candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                                    "finishReason": "STOP", "index": 0}],
+                    "usageMetadata": {"promptTokenCount": input_tokens, "candidatesTokenCount": output_tokens,
+                                      "totalTokenCount": input_tokens + output_tokens},
+                }
+
+            def do_GET(self):
+                path = unquote(self.path.split("?", 1)[0])
+                if path.startswith("/v1/batches/"):
+                    batch = server.batches.get(path[len("/v1/batches/"):])
+                    if batch is None:
+                        self.send_json(404, {"error": {"message": f"No batch {path}"}})
+                    else:
+                        self.send_json(200, self.batch_state(batch))
+                elif path.startswith("/v1/files/") and path.endswith("/content"):
+                    file = server.files.get(path[len("/v1/files/"):-len("/content")])
+                    if file is None:
+                        self.send_json(404, {"error": {"message": f"No file {path}"}})
+                    else:
+                        self.send_bytes(200, file["content"], "application/octet-stream")
+                elif path.startswith("/model-invocation-job/"):
+                    job = server.jobs.get(path[len("/model-invocation-job/"):])
+                    if job is None:
+                        self.send_json(404, {"message": f"No job {path}"},
+                                       {"x-amzn-ErrorType": "ResourceNotFoundException:"})
+                    else:
+                        self.send_json(200, self.batch_state(job))
+                else:
+                    # S3 GetObject (path-style /<bucket>/<key>)
+                    content = server.objects.get(path.lstrip("/"))
+                    if content is None:
+                        self.send_bytes(404, b"<Error><Code>NoSuchKey</Code></Error>", "application/xml")
+                    else:
+                        self.send_bytes(200, content, "application/octet-stream")
+
+            def do_PUT(self):
+                # S3 PutObject (path-style /<bucket>/<key>)
+                server.objects[unquote(self.path.split("?", 1)[0]).lstrip("/")] = self.read_body()
+                self.send_response(200)
+                self.send_header("ETag", '"mock"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def send_bytes(self, status, content, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def batch_state(self, batch):
+                # Status of a batch / job: in progress until batch_delay has passed since its submission
+                state = {key: value for key, value in batch.items() if key not in ("ready_at", "done")}
+                if time.monotonic() < batch["ready_at"]:
+                    return {**state, "status": "in_progress" if "object" in batch else "InProgress"}
+                return {**state, **batch["done"]}
+
+            def create_file(self, body):
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+                fields = {}
+                for part in message.iter_parts():
+                    fields[part.get_param("name", header="content-disposition")] = (
+                        part.get_filename(), part.get_payload(decode=True))
+                filename, content = fields["file"]
+                file = {"id": server.new_id("file-"), "object": "file", "bytes": len(content),
+                        "created_at": int(time.time()), "filename": filename or "upload.jsonl",
+                        "purpose": fields.get("purpose", (None, b"batch"))[1].decode(), "status": "processed"}
+                server.files[file["id"]] = {**file, "content": content}
+                self.send_json(200, file)
+
+            def create_openai_batch(self, request):
+                input_file = server.files.get(request.get("input_file_id"))
+                if input_file is None:
+                    self.send_json(404, {"error": {"message": f"No file {request.get('input_file_id')}"}})
+                    return
+                lines, failed = [], 0
+                for line in input_file["content"].decode("utf-8").splitlines():
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    server.count("batch_records")
+                    record = {"id": server.new_id("batch_req_"), "custom_id": item["custom_id"], "error": None}
+                    if server.draw_record_failure():
+                        failed += 1
+                        record["response"] = {"status_code": 500, "request_id": server.new_id("req_"),
+                                              "body": {"error": {"message": "Mock error", "type": "server_error"}}}
+                    else:
+                        record["response"] = {"status_code": 200, "request_id": server.new_id("req_"),
+                                              "body": self.openai_response(item["body"], item["url"])}
+                    lines.append(json.dumps(record))
+                output_id = server.new_id("file-")
+                output = "\n".join(lines).encode("utf-8")
+                server.files[output_id] = {"id": output_id, "content": output}
+                batch = {"id": server.new_id("batch_"), "object": "batch", "endpoint": request.get("endpoint"),
+                         "input_file_id": input_file["id"], "completion_window": request.get("completion_window"),
+                         "status": "validating", "created_at": int(time.time()),
+                         "ready_at": time.monotonic() + server.batch_delay,
+                         "done": {"status": "completed", "output_file_id": output_id, "completed_at": int(time.time()),
+                                  "request_counts": {"total": len(lines), "completed": len(lines) - failed,
+                                                     "failed": failed}}}
+                server.batches[batch["id"]] = batch
+                self.send_json(200, self.batch_state(batch))
+
+            def create_bedrock_job(self, request):
+                input_uri = request["inputDataConfig"]["s3InputDataConfig"]["s3Uri"]
+                content = server.objects.get(input_uri.removeprefix("s3://"))
+                if content is None:
+                    self.send_json(400, {"message": f"No input at {input_uri}"},
+                                   {"x-amzn-ErrorType": "ValidationException:"})
+                    return
+                job_id = server.new_id("")
+                lines = []
+                for line in content.decode("utf-8").splitlines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    server.count("batch_records")
+                    if server.draw_record_failure():
+                        record["error"] = {"errorCode": 500, "errorMessage": "Mock error"}
+                    else:
+                        record["modelOutput"] = self.bedrock_response(record["modelInput"],
+                                                                      f"/model/{request['modelId']}/invoke")
+                    lines.append(json.dumps(record))
+                # Bedrock writes the results to <output uri>/<job id>/<input file name>.out
+                output_uri = request["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"].removeprefix("s3://")
+                output_key = f"{output_uri.rstrip('/')}/{job_id}/{input_uri.rsplit('/', 1)[-1]}.out"
+                server.objects[output_key] = "\n".join(lines).encode("utf-8")
+                job_arn = f"arn:aws:bedrock:us-west-2:000000000000:model-invocation-job/{job_id}"
+                server.jobs[job_arn] = {
+                    "jobArn": job_arn, "jobName": request["jobName"], "modelId": request["modelId"],
+                    "roleArn": request["roleArn"], "status": "Submitted",
+                    "submitTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "inputDataConfig": request["inputDataConfig"], "outputDataConfig": request["outputDataConfig"],
+                    "ready_at": time.monotonic() + server.batch_delay, "done": {"status": "Completed"}}
+                self.send_json(200, {"jobArn": job_arn})
+
+            def openai_stream(self, request, path):
+                response = self.openai_response(request, path)
+                text = response["choices"][0]["message"]["content"]
+                base = {key: response[key] for key in ("id", "created", "model")}
+                chunks = [{**base, "object": "chat.completion.chunk",
+                           "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                          for piece in server.chunks(text)]
+                chunks.append({**base, "object": "chat.completion.chunk",
+                               "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    chunks.append({**base, "object": "chat.completion.chunk", "choices": [],
+                                   "usage": response["usage"]})
+                frames = [f"data: {json.dumps(chunk)}\n\n".encode() for chunk in chunks]
+                self.send_stream("text/event-stream", frames + [b"data: [DONE]\n\n"])
+
+            def bedrock_stream(self, request, path):
+                response = self.bedrock_response(request, path[:-len("-with-response-stream")])
+                usage = response["usage"]
+                events = [{"type": "message_start",
+                           "message": {**response, "content": [], "usage": {"input_tokens": usage["input_tokens"],
+                                                                            "output_tokens": 1}}},
+                          {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}]
+                events += [{"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}
+                           for piece in server.chunks(response["content"][0]["text"])]
+                events += [{"type": "content_block_stop", "index": 0},
+                           {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                            "usage": {"output_tokens": usage["output_tokens"]}},
+                           {"type": "message_stop"}]
+                headers = {":event-type": "chunk", ":content-type": "application/json", ":message-type": "event"}
+                frames = [encode_event_message(headers, json.dumps(
+                    {"bytes": base64.b64encode(json.dumps(event).encode()).decode()}).encode()) for event in events]
+                self.send_stream("application/vnd.amazon.eventstream", frames)
+
+            def gemini_stream(self, request, path):
+                response = self.gemini_response(request, path)
+                pieces = server.chunks(response["candidates"][0]["content"]["parts"][0]["text"])
+                chunks = [{"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}, "index": 0}]}
+                          for piece in pieces]
+                chunks[-1] = {**response, "candidates": [{**chunks[-1]["candidates"][0], "finishReason": "STOP"}]}
+                self.send_stream("text/event-stream", [f"data: {json.dumps(chunk)}\r\n\r\n".encode()
+                                                       for chunk in chunks])
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI, Bedrock and Gemini APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="fixed:<s>, uniform:<min>:<max> or lognormal:<median>:<sigma>")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests failing with a 429")
+    parser.add_argument("--requests-per-minute", type=int, default=None, help="throttle above this request rate")
+    parser.add_argument("--code-file", default=None, help="canned solver code returned for every request")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--trailing-text", default="", help="explanation returned after the code block")
+    parser.add_argument("--chunk-size", type=int, default=64, help="characters per streamed chunk")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="seconds before a batch job completes")
+    args = parser.parse_args()
+
+    solver_code = None
+    if args.code_file:
+        with open(args.code_file, "r") as f:
+            solver_code = f.read()
+    mock_server = MockLLMServer(args.host, args.port, args.latency, args.error_rate, args.throttle_rate,
+                                args.requests_per_minute, solver_code, args.seed, args.trailing_text,
+                                args.chunk_size, args.chunk_delay, args.batch_delay)
+    print(f"Mock LLM server listening on {mock_server.url} (set MOCK_LLM_URL={mock_server.url})")
+    try:
+        mock_server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock_server.httpd.server_close()
+        sys.exit(0)
@@ -0,0 +1,669 @@
+import os
+import sys
+import ast
+import json
+import time
+import runpy
+import atexit
+import select
+import signal
+import socket
+import tempfile
+import threading
+import traceback
+import selectors
+import subprocess
+
+# Interval between two samples of a running solver
+POLL_INTERVAL = 0.05
+
+# Bytes of stdout / stderr kept per solver run (half from the start, half from the end of the stream)
+MAX_OUTPUT_BYTES = 1024 * 1024
+
+# Exit code used by a solver stopped by the floating point error hook
+DIVERGED_EXIT_CODE = 86
+
+# Interpreter of the solvers (and of the fork server), the one running the benchmark so the execution cache and the
+# pre-flight import check describe the environment the solvers actually get
+SOLVER_PYTHON = sys.executable
+
+# Modules imported once by the fork server, so every solver process starts with them already loaded
+DEFAULT_PRELOAD = ["numpy", "scipy", "scipy.sparse", "scipy.sparse.linalg", "scipy.linalg", "matplotlib",
+                   "matplotlib.pyplot"]
+
+
+def print_script_traceback(filepath, exc):
+    # Drop the worker / runpy frames so the traceback looks the same as `python3 script.py`
+    tb = exc.__traceback__
+    while tb is not None and os.path.abspath(tb.tb_frame.f_code.co_filename) != filepath:
+        tb = tb.tb_next
+    traceback.print_exception(type(exc), exc, tb if tb is not None else exc.__traceback__)
+
+
+def install_fp_error_hook():
+    # Stop the solver with DIVERGED_EXIT_CODE on the first numpy overflow (invalid values such as 0/0 are not trapped)
+    import numpy as np
+
+    def on_fp_error(kind, flag):
+        sys.stderr.write(f"Diverged: floating point {kind} encountered, the solver was stopped early.\n")
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(DIVERGED_EXIT_CODE)
+
+    np.seterrcall(on_fp_error)
+    np.seterr(over="call")
+
+
+def get_task_name(filepath):
+    # solver/<model>/<prompt>/<task>.py -> <task>
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+
+def get_file_stem(file):
+    # "results/u.npy" -> "u" (None for an open file object)
+    if not isinstance(file, (str, os.PathLike)):
+        return None
+    stem = os.path.basename(os.fspath(file))
+    if stem.endswith((".npy", ".npz")):
+        stem = stem[:-4]
+    return stem or None
+
+
+def get_literal_stems(filepath):
+    # File stems spelled out as string literals in the solver, e.g. "u" for np.save("u.npy", u_next) or
+    # os.path.join(out, "u.npy"), as opposed to names built at runtime such as f"u_{nx}.npy"
+    try:
+        with open(filepath, "r") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return set()
+    stems = set()
+    nodes = [tree]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, ast.JoinedStr):
+            # The literal parts of an f-string are only fragments of the name
+            nodes.extend(value.value for value in node.values if isinstance(value, ast.FormattedValue))
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            stems.add(get_file_stem(node.value))
+        nodes.extend(ast.iter_child_nodes(node))
+    stems.discard(None)
+    return stems
+
+
+def get_output_var(file, names, task, literal_stems):
+    # <var> of the intercepted save: the file name if it already is <var>_<task> or is written in the source, else
+    # the variable passed in, else the file name itself (None if there is nothing to name the output after)
+    stem = get_file_stem(file)
+    if stem and stem.endswith(f"_{task}"):
+        return stem[:-len(task) - 1]
+    if stem in literal_stems:
+        return stem
+    if len(names) == 1:
+        return names[0]
+    return stem
+
+
+def get_caller_names(frame, value):
+    # Names bound to this exact object in the calling frame, e.g. `u` for np.save(f"u_{nx}.npy", u)
+    scope = {**frame.f_globals, **frame.f_locals}
+    return [name for name, obj in scope.items() if obj is value and not name.startswith("_")]
+
+
+def install_save_hook(output_dir, task, literal_stems=frozenset()):
+    # Route np.save / np.savez / np.savez_compressed to <output_dir>/<var>_<task>.npy, one file per array, named
+    # after the file name, keyword or variable passed in (see get_output_var)
+    import numpy as np
+    original_save = np.save
+    os.makedirs(output_dir, exist_ok=True)
+
+    def output_path(var):
+        return os.path.join(output_dir, f"{var}_{task}.npy")
+
+    def save(file, arr, *args, **kwargs):
+        var = get_output_var(file, get_caller_names(sys._getframe(1), arr), task, literal_stems)
+        if var is None:
+            # e.g. an open file object with an expression: nothing to route it by, keep the original behaviour
+            return original_save(file, arr, *args, **kwargs)
+        return original_save(output_path(var), arr, *args, **kwargs)
+
+    def savez(file, *args, allow_pickle=True, **kwds):
+        frame = sys._getframe(1)
+        arrays = dict(kwds)
+        for i, arr in enumerate(args):
+            names = get_caller_names(frame, arr)
+            if len(args) == 1 and not kwds:
+                # A single array is named like np.save names it
+                var = get_output_var(file, names, task, literal_stems)
+            else:
+                var = names[0] if len(names) == 1 else None
+            arrays[var or f"arr_{i}"] = arr
+        for var, arr in arrays.items():
+            original_save(output_path(var), arr, allow_pickle=allow_pickle)
+
+    np.save = save
+    np.savez = savez
+    np.savez_compressed = savez
+
+
+def install_hooks(filepath, detect_fp_errors=False, output_dir=None):
+    if detect_fp_errors:
+        install_fp_error_hook()
+    if output_dir:
+        install_save_hook(output_dir, get_task_name(filepath), get_literal_stems(filepath))
+
+
+def run_script(filepath, cwd):
+    # Run one solver as `python3 filepath` would in cwd and return its exit code
+    filepath = os.path.abspath(filepath)
+    os.chdir(cwd)
+    sys.argv = [filepath]
+    sys.path[0] = os.path.dirname(filepath)
+
+    try:
+        runpy.run_path(filepath, run_name="__main__")
+        exit_code = 0
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        print_script_traceback(filepath, e)
+        exit_code = 1
+
+    try:
+        atexit._run_exitfuncs()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return exit_code
+
+
+def send_message(conn, message):
+    conn.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def recv_message(conn, buffer, timeout=None):
+    # Returns (message, buffer), message is None if the timeout expired first
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while b"\n" not in buffer:
+        if deadline is not None:
+            ready, _, _ = select.select([conn], [], [], max(0.0, deadline - time.monotonic()))
+            if not ready:
+                return None, buffer
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise EOFError("Warm worker server closed the connection.")
+        buffer += chunk
+    line, buffer = buffer.split(b"\n", 1)
+    return json.loads(line), buffer
+
+
+def serve(listener_fd, preload):
+    # Fork server loop: one child per {"filepath", "cwd", "detect_fp_errors", "output_dir"} request (sent with the
+    # client's stdout/stderr pipe ends), answered with {"pid"} and then {"returncode", "rusage"}
+    for module in preload:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    listener = socket.socket(fileno=listener_fd)
+    sig_r, sig_w = os.pipe()
+    os.set_blocking(sig_r, False)
+    os.set_blocking(sig_w, False)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.set_wakeup_fd(sig_w)
+
+    # map child pids to the client connections waiting for them
+    children = {}
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    selector.register(sig_r, selectors.EVENT_READ)
+    # stdin is a pipe held by the client, it reaches EOF when the client exits
+    selector.register(sys.stdin, selectors.EVENT_READ)
+
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is sys.stdin:
+                if not os.read(sys.stdin.fileno(), 4096):
+                    return
+
+            elif key.fileobj is listener:
+                conn, _ = listener.accept()
+                try:
+                    data, fds, _, _ = socket.recv_fds(conn, 65536, 2)
+                    request = json.loads(data)
+                except Exception:
+                    conn.close()
+                    continue
+
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    # Child: drop the server state and run the script with the client's pipes as stdout/stderr
+                    exit_code = 1
+                    try:
+                        signal.set_wakeup_fd(-1)
+                        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                        signal.signal(signal.SIGINT, signal.SIG_DFL)
+                        selector.close()
+                        listener.close()
+                        conn.close()
+                        os.close(sig_r)
+                        os.close(sig_w)
+                        devnull = os.open(os.devnull, os.O_RDONLY)
+                        os.dup2(devnull, 0)
+                        os.dup2(fds[0], 1)
+                        os.dup2(fds[1], 2)
+                        for fd in [devnull, *fds]:
+                            os.close(fd)
+                        install_hooks(request["filepath"], request.get("detect_fp_errors"), request.get("output_dir"))
+                        exit_code = run_script(request["filepath"], request["cwd"])
+                    finally:
+                        os._exit(exit_code)
+
+                for fd in fds:
+                    os.close(fd)
+                try:
+                    send_message(conn, {"pid": pid})
+                    children[pid] = conn
+                except OSError:
+                    conn.close()
+
+            else:
+                # SIGCHLD: reap every finished child and report its exit status
+                try:
+                    while os.read(sig_r, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                while True:
+                    try:
+                        pid, status, rusage = os.wait4(-1, os.WNOHANG)
+                    except ChildProcessError:
+                        break
+                    if pid == 0:
+                        break
+                    conn = children.pop(pid, None)
+                    if conn is None:
+                        continue
+                    try:
+                        send_message(conn, {
+                            "returncode": os.waitstatus_to_exitcode(status),
+                            "rusage": {"user_time": rusage.ru_utime, "system_time": rusage.ru_stime,
+                                       "max_rss": rusage.ru_maxrss},
+                        })
+                    except OSError:
+                        pass
+                    conn.close()
+
+
+class BoundedOutput:
+    # Head + tail buffer of an output stream with a fixed byte cap, the middle is dropped and only counted
+    def __init__(self, max_bytes=MAX_OUTPUT_BYTES):
+        self.head_bytes = max_bytes // 2
+        self.tail_bytes = max_bytes - self.head_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.dropped_bytes = 0
+        self.dropped_lines = 0
+
+    def write(self, chunk):
+        if len(self.head) < self.head_bytes:
+            n = self.head_bytes - len(self.head)
+            self.head += chunk[:n]
+            chunk = chunk[n:]
+        self.tail += chunk
+        excess = len(self.tail) - self.tail_bytes
+        if excess > 0:
+            self.dropped_lines += self.tail.count(b"\n", 0, excess)
+            self.dropped_bytes += excess
+            del self.tail[:excess]
+
+    def _cut(self):
+        # Cut on line boundaries so no partial line is shown around the dropped part
+        head_end = self.head.rfind(b"\n") + 1
+        tail_start = self.tail.find(b"\n") + 1
+        return head_end, tail_start
+
+    def dropped(self):
+        if not self.dropped_bytes:
+            return 0, 0
+        head_end, tail_start = self._cut()
+        dropped_lines = self.dropped_lines + self.tail.count(b"\n", 0, tail_start)
+        dropped_bytes = self.dropped_bytes + len(self.head) - head_end + tail_start
+        return dropped_lines, dropped_bytes
+
+    def getvalue(self):
+        if not self.dropped_bytes:
+            return bytes(self.head + self.tail)
+        head_end, tail_start = self._cut()
+        dropped_lines, dropped_bytes = self.dropped()
+        marker = f"... [{dropped_lines} lines ({dropped_bytes} bytes) of output dropped] ...\n".encode("utf-8")
+        return bytes(self.head[:head_end]) + marker + bytes(self.tail[tail_start:])
+
+
+def read_stream(fd, output):
+    with open(fd, "rb") as stream:
+        for chunk in iter(lambda: stream.read(65536), b""):
+            output.write(chunk)
+
+
+def start_output_readers(stdout_r, stderr_r, max_output_bytes=MAX_OUTPUT_BYTES):
+    # Stream stdout/stderr in background threads so a chatty solver never blocks on a full pipe
+    outputs = (BoundedOutput(max_output_bytes), BoundedOutput(max_output_bytes))
+    readers = [threading.Thread(target=read_stream, args=(stdout_r, outputs[0]), daemon=True),
+               threading.Thread(target=read_stream, args=(stderr_r, outputs[1]), daemon=True)]
+    for reader in readers:
+        reader.start()
+    return readers, outputs
+
+
+def collect_output(readers, outputs):
+    for reader in readers:
+        reader.join()
+    # Same newline handling as subprocess.run(text=True)
+    return tuple(o.getvalue().decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+                 for o in outputs)
+
+
+def dropped_output(outputs):
+    dropped = {}
+    for name, output in zip(("stdout", "stderr"), outputs):
+        lines, n_bytes = output.dropped()
+        if n_bytes:
+            dropped[name] = {"lines": lines, "bytes": n_bytes}
+    return dropped
+
+
+def list_descendants(pid):
+    # Linux only: walk /proc/<pid>/task/<tid>/children recursively
+    descendants = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        task_dir = f"/proc/{current}/task"
+        try:
+            tids = os.listdir(task_dir)
+        except OSError:
+            continue
+        for tid in tids:
+            try:
+                with open(os.path.join(task_dir, tid, "children"), "r") as f:
+                    children = [int(c) for c in f.read().split()]
+            except OSError:
+                continue
+            descendants.extend(children)
+            pending.extend(children)
+    return descendants
+
+
+def read_rss_mb(pids):
+    # Linux only: current resident set size of the given processes, from /proc/<pid>/status
+    rss_kb = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return rss_kb / 1024
+
+
+def rusage_to_resources(wall_time, user_time, system_time, max_rss, child_processes):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    return {
+        "wall_time": round(wall_time, 3),
+        "user_time": round(user_time, 3),
+        "system_time": round(system_time, 3),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "child_processes": child_processes,
+    }
+
+
+class DivergenceWatchdog:
+    # Stops runaway solvers before the timeout ("diverged" status): max_rss_mb, max_rss_growth_mb_per_s over
+    # growth_window seconds, and the opt-in detect_fp_errors hook (first numpy overflow)
+    def __init__(self, max_rss_mb=None, max_rss_growth_mb_per_s=None, growth_window=5.0, detect_fp_errors=False):
+        self.max_rss_mb = max_rss_mb
+        self.max_rss_growth_mb_per_s = max_rss_growth_mb_per_s
+        self.growth_window = growth_window
+        self.detect_fp_errors = detect_fp_errors
+
+    def __repr__(self):
+        return (f"DivergenceWatchdog(max_rss_mb={self.max_rss_mb}, "
+                f"max_rss_growth_mb_per_s={self.max_rss_growth_mb_per_s}, growth_window={self.growth_window}, "
+                f"detect_fp_errors={self.detect_fp_errors})")
+
+    def check(self, rss_samples):
+        # rss_samples: [(elapsed seconds, rss MB), ...] over the last growth window, oldest first
+        elapsed, rss_mb = rss_samples[-1]
+        if self.max_rss_mb is not None and rss_mb > self.max_rss_mb:
+            return f"RSS {rss_mb:.0f}MB exceeded the {self.max_rss_mb}MB limit"
+        if self.max_rss_growth_mb_per_s is not None:
+            start, start_rss_mb = rss_samples[0]
+            if elapsed - start >= 0.9 * self.growth_window:
+                rate = (rss_mb - start_rss_mb) / (elapsed - start)
+                if rate > self.max_rss_growth_mb_per_s:
+                    return f"RSS grew by {rate:.0f}MB/s over the last {elapsed - start:.1f}s"
+        return None
+
+
+class ProcessMonitor:
+    # Samples a running solver for its child process count and, with a watchdog, its RSS growth
+    def __init__(self, pid, watchdog=None):
+        self.pid = pid
+        self.watchdog = watchdog
+        self.start_time = time.monotonic()
+        self.children = set()
+        self.rss_samples = []
+
+    def sample(self):
+        # Returns the reason to stop the solver early, or None
+        descendants = list_descendants(self.pid)
+        self.children.update(descendants)
+        if self.watchdog is None or (self.watchdog.max_rss_mb is None
+                                     and self.watchdog.max_rss_growth_mb_per_s is None):
+            return None
+
+        elapsed = self.wall_time()
+        self.rss_samples.append((elapsed, read_rss_mb([self.pid] + descendants)))
+        while len(self.rss_samples) > 1 and elapsed - self.rss_samples[1][0] >= self.watchdog.growth_window:
+            self.rss_samples.pop(0)
+        return self.watchdog.check(self.rss_samples)
+
+    def diverged_reason(self, returncode):
+        if self.watchdog is not None and self.watchdog.detect_fp_errors and returncode == DIVERGED_EXIT_CODE:
+            return "floating point overflow detected"
+        return None
+
+    def wall_time(self):
+        return time.monotonic() - self.start_time
+
+
+class SolverResult(subprocess.CompletedProcess):
+    # CompletedProcess plus the resources of the run: wall_time, user_time, system_time [s], peak_rss_mb,
+    # child_processes
+    def __init__(self, args, returncode, stdout=None, stderr=None, resources=None, dropped_output=None,
+                 status=None, status_reason=None):
+        super().__init__(args, returncode, stdout, stderr)
+        self.resources = resources if resources is not None else {}
+        # Lines / bytes dropped from the middle of stdout and stderr by the bounded capture
+        self.dropped_output = dropped_output if dropped_output is not None else {}
+        # "success", "failed" or "diverged" (stopped early by the divergence watchdog)
+        self.status = status if status is not None else ("success" if returncode == 0 else "failed")
+        self.status_reason = status_reason
+
+
+def run_subprocess(filepath, timeout=60, cwd=None, max_output_bytes=MAX_OUTPUT_BYTES, watchdog=None, output_dir=None):
+    # Like subprocess.run(capture_output=True, text=True) but reaped with wait4 for the CPU time and peak RSS;
+    # with output_dir the NumPy saves go to <output_dir>/<var>_<task>.npy
+    args = [SOLVER_PYTHON, filepath]
+    command = args
+    detect_fp_errors = watchdog is not None and watchdog.detect_fp_errors
+    if detect_fp_errors or output_dir:
+        # Start the script through this module so the hooks are installed first
+        command = [SOLVER_PYTHON, os.path.abspath(__file__), "--run", filepath]
+        if detect_fp_errors:
+            command.append("--detect-fp-errors")
+        if output_dir:
+            command += ["--output-dir", output_dir]
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    try:
+        process = subprocess.Popen(command, stdout=stdout_w, stderr=stderr_w, cwd=cwd)
+    except BaseException:
+        for fd in (stdout_r, stderr_r):
+            os.close(fd)
+        raise
+    finally:
+        os.close(stdout_w)
+        os.close(stderr_w)
+    readers, outputs = start_output_readers(stdout_r, stderr_r, max_output_bytes)
+
+    monitor = ProcessMonitor(process.pid, watchdog)
+    timed_out = False
+    diverged_reason = None
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        if monitor.wall_time() >= timeout:
+            process.kill()
+            pid, status, rusage = os.wait4(process.pid, 0)
+            timed_out = True
+            break
+        diverged_reason = monitor.sample()
+        if diverged_reason is not None:
+            process.kill()
+            pid, status, rusage = os.wait4(process.pid, 0)
+            break
+        time.sleep(POLL_INTERVAL)
+    # The process is already reaped, tell Popen so it does not wait for it again
+    process.returncode = os.waitstatus_to_exitcode(status)
+    wall_time = monitor.wall_time()
+    if diverged_reason is None:
+        diverged_reason = monitor.diverged_reason(process.returncode)
+
+    stdout, stderr = collect_output(readers, outputs)
+    if timed_out:
+        raise subprocess.TimeoutExpired(args, timeout, output=stdout, stderr=stderr)
+
+    resources = rusage_to_resources(wall_time, rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss,
+                                    len(monitor.children))
+    return SolverResult(args, process.returncode, stdout, stderr, resources, dropped_output(outputs),
+                        "diverged" if diverged_reason else None, diverged_reason)
+
+
+class WarmWorkerPool:
+    # Fork server with numpy/scipy/matplotlib already imported: each script runs in a fresh forked child, isolated
+    # like a python3 subprocess but without the interpreter start-up and import cost
+    def __init__(self, preload=None):
+        self.preload = DEFAULT_PRELOAD if preload is None else list(preload)
+        self.server = None
+        self.address = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.server is not None and self.server.poll() is None:
+                return
+            self.address = os.path.join(tempfile.mkdtemp(prefix="solver_worker_"), "server.sock")
+            listener = socket.socket(socket.AF_UNIX)
+            listener.bind(self.address)
+            listener.listen(128)
+            try:
+                self.server = subprocess.Popen(
+                    [SOLVER_PYTHON, os.path.abspath(__file__), str(listener.fileno()), *self.preload],
+                    stdin=subprocess.PIPE, pass_fds=[listener.fileno()]
+                )
+            finally:
+                listener.close()
+
+    def close(self):
+        with self._lock:
+            if self.server is not None:
+                self.server.stdin.close()
+                self.server.wait()
+                self.server = None
+
+    def run(self, filepath, timeout=60, cwd=None, max_output_bytes=MAX_OUTPUT_BYTES, watchdog=None, output_dir=None):
+        self.start()
+        cwd = os.getcwd() if cwd is None else cwd
+        args = [SOLVER_PYTHON, filepath]
+
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        with socket.socket(socket.AF_UNIX) as conn:
+            try:
+                conn.connect(self.address)
+                request = {"filepath": filepath, "cwd": cwd,
+                           "detect_fp_errors": watchdog is not None and watchdog.detect_fp_errors,
+                           "output_dir": output_dir}
+                socket.send_fds(conn, [json.dumps(request).encode("utf-8")], [stdout_w, stderr_w])
+            except BaseException:
+                for fd in (stdout_r, stderr_r):
+                    os.close(fd)
+                raise
+            finally:
+                # The child holds its own copies of the write ends
+                os.close(stdout_w)
+                os.close(stderr_w)
+            readers, outputs = start_output_readers(stdout_r, stderr_r, max_output_bytes)
+
+            buffer = b""
+            message, buffer = recv_message(conn, buffer)
+            monitor = ProcessMonitor(message["pid"], watchdog)
+            timed_out = False
+            diverged_reason = None
+            while True:
+                message, buffer = recv_message(conn, buffer, POLL_INTERVAL)
+                if message is not None:
+                    break
+                timed_out = monitor.wall_time() >= timeout
+                if not timed_out:
+                    diverged_reason = monitor.sample()
+                if timed_out or diverged_reason is not None:
+                    try:
+                        os.kill(monitor.pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    message, buffer = recv_message(conn, buffer)
+                    break
+            wall_time = monitor.wall_time()
+            if diverged_reason is None:
+                diverged_reason = monitor.diverged_reason(message["returncode"])
+
+        stdout, stderr = collect_output(readers, outputs)
+        if timed_out:
+            raise subprocess.TimeoutExpired(args, timeout, output=stdout, stderr=stderr)
+
+        rusage = message["rusage"]
+        resources = rusage_to_resources(wall_time, rusage["user_time"], rusage["system_time"], rusage["max_rss"],
+                                        len(monitor.children))
+        return SolverResult(args, message["returncode"], stdout, stderr, resources, dropped_output(outputs),
+                            "diverged" if diverged_reason else None, diverged_reason)
+
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--run":
+        # python3 solver_worker.py --run <script> [--detect-fp-errors] [--output-dir <dir>]: run one solver with the
+        # floating point and / or save hooks installed
+        options = sys.argv[3:]
+        install_hooks(sys.argv[2], "--detect-fp-errors" in options,
+                      options[options.index("--output-dir") + 1] if "--output-dir" in options else None)
+        sys.exit(run_script(sys.argv[2], os.getcwd()))
+    # python3 solver_worker.py <listener fd> <preload modules...>: fork server of WarmWorkerPool
+    serve(int(sys.argv[1]), sys.argv[2:])
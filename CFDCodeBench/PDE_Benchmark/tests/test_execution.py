@@ -0,0 +1,162 @@
+import logging
+import textwrap
+
+import numpy as np
+import pytest
+
+from solver_worker import WarmWorkerPool, SolverResult, DivergenceWatchdog
+from utils import (execute_python_script, execute_python_script_cached, build_execution_record, ExecutionCache,
+                   call_execute_solver)
+
+
+def write_script(directory, name, source):
+    path = directory / name
+    path.write_text(textwrap.dedent(source))
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WarmWorkerPool(preload=["numpy"])
+    pool.start()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(params=["subprocess", "warm_pool"])
+def run(request, pool):
+    selected_pool = pool if request.param == "warm_pool" else None
+
+    def run(script, **kwargs):
+        feedback, result = execute_python_script(script, pool=selected_pool, log=logging.getLogger("test"), **kwargs)
+        return feedback, build_execution_record(script, result)
+    return run
+
+
+def test_successful_run_record(tmp_path, run):
+    script = write_script(tmp_path, "ok.py", "print('done')\n")
+    feedback, record = run(script)
+    assert feedback == "Execution successful, no errors detected."
+    assert record["status"] == "success"
+    assert record["passed"] is True
+    assert record["returncode"] == 0
+    assert record["task"].endswith("ok")
+    assert record["wall_time"] >= 0
+
+
+def test_failed_run_record(tmp_path, run):
+    script = write_script(tmp_path, "fail.py", "raise RuntimeError('boom')\n")
+    feedback, record = run(script)
+    assert "RuntimeError: boom" in feedback
+    assert record["status"] == "failed"
+    assert record["passed"] is False
+    assert record["returncode"] == 1
+
+
+def test_timeout_run_record(tmp_path, run):
+    script = write_script(tmp_path, "slow.py", "import time\ntime.sleep(30)\n")
+    feedback, record = run(script, timeout=1)
+    assert feedback == "❌ Execution timed out after 1 seconds."
+    assert record["status"] == "timeout"
+    assert record["passed"] is False
+    assert record["returncode"] is None
+
+
+OVERFLOW_SCRIPT = """
+    import numpy as np
+    u = np.array([1e300])
+    u = u * u
+    print("not reached")
+"""
+
+
+def test_overflow_is_diverged_with_fp_detection(tmp_path, run):
+    script = write_script(tmp_path, "overflow.py", OVERFLOW_SCRIPT)
+    feedback, record = run(script, watchdog=DivergenceWatchdog(detect_fp_errors=True))
+    assert feedback.startswith("❌ The solver diverged and was stopped early: floating point overflow detected")
+    assert record["status"] == "diverged"
+    assert record["status_reason"] == "floating point overflow detected"
+    assert record["passed"] is False
+
+
+def test_overflow_runs_on_without_fp_detection(tmp_path, run):
+    script = write_script(tmp_path, "overflow.py", OVERFLOW_SCRIPT)
+    _, record = run(script, watchdog=DivergenceWatchdog())
+    assert record["status"] == "success"
+
+
+def test_invalid_values_are_not_trapped(tmp_path, run):
+    # A 0/0 the solver masks afterwards is not a divergence
+    script = write_script(tmp_path, "nan.py", """
+        import numpy as np
+        with np.errstate(invalid="ignore"):
+            u = np.array([0.0]) / np.array([0.0])
+        print(np.nan_to_num(u))
+    """)
+    _, record = run(script, watchdog=DivergenceWatchdog(detect_fp_errors=True))
+    assert record["status"] == "success"
+
+
+SAVE_SCRIPT = """
+    import numpy as np
+    u = np.linspace(0, 1, 11)
+    np.save("u.npy", u)
+    print("saved")
+"""
+
+
+def test_execution_cache_round_trip(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"))
+    save_dir = tmp_path / "prediction"
+    script = write_script(tmp_path, "heat.py", SAVE_SCRIPT)
+
+    feedback, result = execute_python_script_cached(script, cache=cache, save_dir=str(save_dir), capture_outputs=True)
+    assert feedback == "Execution successful, no errors detected."
+    assert not getattr(result, "cached", False)
+    expected = np.load(save_dir / "u_heat.npy")
+
+    (save_dir / "u_heat.npy").unlink()
+    feedback, cached = execute_python_script_cached(script, cache=cache, save_dir=str(save_dir), capture_outputs=True)
+    assert feedback == "Restored from execution cache."
+    assert cached.cached is True
+    assert (cached.returncode, cached.stdout, cached.stderr, cached.status) == \
+        (result.returncode, result.stdout, result.stderr, result.status)
+    assert cached.resources == result.resources
+    np.testing.assert_array_equal(np.load(save_dir / "u_heat.npy"), expected)
+    assert build_execution_record("heat.py", cached)["cached"] is True
+
+
+def test_execution_cache_restores_dropped_output(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"))
+    script = write_script(tmp_path, "chatty.py", "print('x')\n")
+    result = SolverResult(["python3", script], 0, "head\n... [5 lines (20 bytes) of output dropped] ...\ntail\n", "",
+                          {"wall_time": 1.0}, dropped_output={"stdout": {"lines": 5, "bytes": 20}})
+    key = cache.make_key(script, 60)
+    cache.store(key, script, result, None, 0)
+
+    cached = cache.load(key, str(tmp_path / "prediction"))
+    assert cached.dropped_output == {"stdout": {"lines": 5, "bytes": 20}}
+    assert cached.stdout == result.stdout
+    record = build_execution_record("chatty.py", cached)
+    assert (record["stdout_dropped_lines"], record["stdout_dropped_bytes"]) == (5, 20)
+
+
+def test_execution_cache_key(tmp_path):
+    cache = ExecutionCache(str(tmp_path / "cache"))
+    script = write_script(tmp_path, "heat.py", SAVE_SCRIPT)
+    (tmp_path / "copy").mkdir()
+    other = write_script(tmp_path / "copy", "heat.py", SAVE_SCRIPT)
+    assert cache.make_key(script, 60) == cache.make_key(other, 60)
+    assert cache.make_key(script, 60) != cache.make_key(script, 30)
+    assert cache.make_key(script, 60) != cache.make_key(script, 60, DivergenceWatchdog(detect_fp_errors=True))
+    # Captured outputs are written to <save_dir>/<var>_<task>.npy, so both are part of the key
+    assert cache.make_key(script, 60, capture_outputs=True, save_dir="a") != \
+        cache.make_key(script, 60, capture_outputs=True, save_dir="b")
+    assert cache.make_key(script, 60, capture_outputs=True, save_dir="a") != \
+        cache.make_key(write_script(tmp_path, "wave.py", SAVE_SCRIPT), 60, capture_outputs=True, save_dir="a")
+
+
+def test_execute_solver_without_scripts(tmp_path):
+    status_counts = {"pass": 0, "fail": 0, "diverged": 0}
+    assert call_execute_solver(str(tmp_path / "solvers"), str(tmp_path / "execute.log"), status_counts) == []
+    assert status_counts == {"pass": 0, "fail": 0, "diverged": 0}
@@ -0,0 +1,50 @@
+import logging
+
+import pytest
+from openai import OpenAI
+
+from mock_llm_server import MockLLMServer
+from utils import LLMResponseCache, LLMCacheMissError, call_llm_api, extract_model_response, build_conversation
+
+SOLVER_CODE = "import numpy as np\nu = np.zeros(10)\nnp.save('u.npy', u)"
+
+
+@pytest.fixture
+def server():
+    with MockLLMServer(solver_code=SOLVER_CODE, trailing_text="\nSome explanation after the code.") as server:
+        yield server
+
+
+def ask(server, cache, stream):
+    client = OpenAI(api_key="test", base_url=f"{server.url}/v1")
+    conversation = build_conversation("Solve the heat equation", "gpt-4o")
+    response = call_llm_api("gpt-4o", client, conversation, 0.0, None, None, cache, stream, logging.getLogger("test"))
+    return extract_model_response("gpt-4o", response)
+
+
+def test_identical_requests_are_answered_from_the_cache(tmp_path, server):
+    cache = LLMResponseCache(str(tmp_path))
+    first = ask(server, cache, stream=False)
+    assert ask(server, cache, stream=False) == first
+    assert server.stats["requests"] == 1
+
+
+def test_streamed_and_full_responses_are_cached_apart(tmp_path, server):
+    cache = LLMResponseCache(str(tmp_path))
+    streamed = ask(server, cache, stream=True)
+    full = ask(server, cache, stream=False)
+    assert server.stats["requests"] == 2
+    # The streamed response was cut after its code block
+    assert "Some explanation" in full and "Some explanation" not in streamed
+    assert ask(server, cache, stream=True) == streamed
+    assert ask(server, cache, stream=False) == full
+    assert server.stats["requests"] == 2
+
+
+def test_replay_mode_never_calls_the_api(tmp_path, server):
+    ask(server, LLMResponseCache(str(tmp_path)), stream=False)
+    cache = LLMResponseCache(str(tmp_path), mode="replay")
+    ask(server, cache, stream=False)
+    with pytest.raises(LLMCacheMissError):
+        ask(server, cache, stream=True)
+    assert server.stats["requests"] == 1
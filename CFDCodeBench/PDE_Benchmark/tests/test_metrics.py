@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from sklearn.metrics.pairwise import cosine_similarity
+
+from utils import compute_losses, get_field_statistics, compare_files, MIN_FILES_PER_COMPARE_POOL
+
+
+def sklearn_losses(gt, pred):
+    # The original compute_losses
+    gt_flat = gt.flatten()
+    pred_flat = pred.flatten()
+    mse = mean_squared_error(gt_flat, pred_flat)
+    mae = mean_absolute_error(gt_flat, pred_flat)
+    rmse = np.sqrt(mse)
+    cosine_sim = cosine_similarity(gt_flat.reshape(1, -1), pred_flat.reshape(1, -1))[0][0]
+    r2 = r2_score(gt_flat, pred_flat)
+    nmse = mse / np.mean(gt_flat**2)
+    return mse, mae, rmse, cosine_sim, r2, nmse
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("shape", [(257,), (64, 48), (1000, 1000)])
+def test_compute_losses_matches_sklearn(dtype, shape):
+    rng = np.random.default_rng(0)
+    gt = rng.standard_normal(shape).astype(dtype)
+    pred = (gt + 0.1 * rng.standard_normal(shape)).astype(dtype)
+
+    losses = compute_losses(gt, pred)
+    assert losses[:6] == sklearn_losses(gt, pred)
+    assert losses[6] == np.abs(gt.astype(np.float64) - pred).max()
+    assert losses[7:] == (1.0, False)
+
+
+def test_compute_losses_with_precomputed_statistics():
+    rng = np.random.default_rng(1)
+    gt = rng.standard_normal((32, 32))
+    pred = gt + 0.01 * rng.standard_normal((32, 32))
+    stats = get_field_statistics(gt.reshape(-1))
+    assert compute_losses(gt, pred, stats) == compute_losses(gt, pred)
+
+
+@pytest.mark.parametrize("pred_offset", [0.0, 0.5])
+def test_compute_losses_constant_ground_truth(pred_offset):
+    gt = np.full(100, 2.0)
+    pred = gt + pred_offset
+    assert compute_losses(gt, pred)[:6] == sklearn_losses(gt, pred)
+
+
+def test_compute_losses_integer_arrays():
+    gt = np.arange(50)
+    pred = gt[::-1].copy()
+    assert compute_losses(gt, pred)[:6] == sklearn_losses(gt, pred)
+
+
+def test_compute_losses_masks_non_finite_predictions():
+    rng = np.random.default_rng(2)
+    gt = rng.standard_normal(100)
+    pred = gt + 0.1 * rng.standard_normal(100)
+    pred[[3, 50]] = [np.nan, np.inf]
+    finite = np.isfinite(pred)
+
+    losses = compute_losses(gt, pred)
+    assert losses[:6] == sklearn_losses(gt[finite], pred[finite])
+    assert losses[7] == 0.98
+    assert losses[8] is True
+
+
+def test_compute_losses_flags_blow_up():
+    gt = np.ones(10)
+    pred = gt.copy()
+    pred[0] = 1e6
+    assert compute_losses(gt, pred)[8] is True
+
+
+def test_compute_losses_overflowing_squares():
+    rng = np.random.default_rng(3)
+    gt = rng.standard_normal(100)
+    pred = gt + 0.1 * rng.standard_normal(100)
+    expected = compute_losses(gt, pred)
+    losses = compute_losses(gt * 1e300, pred * 1e300)
+    # NMSE, R2 and cosine do not depend on the scale
+    np.testing.assert_allclose([losses[3], losses[4], losses[5]], [expected[3], expected[4], expected[5]], rtol=1e-12)
+    np.testing.assert_allclose(losses[1], expected[1] * 1e300, rtol=1e-12)
+
+
+def test_compute_losses_rejects_invalid_inputs():
+    with pytest.raises(ValueError, match="Complex data not supported"):
+        compute_losses(np.ones(4, dtype=complex), np.ones(4))
+    with pytest.raises(ValueError, match="inconsistent numbers of samples"):
+        compute_losses(np.ones(4), np.ones(5))
+    with pytest.raises(ValueError, match="Input contains NaN"):
+        compute_losses(np.array([1.0, np.nan]), np.ones(2))
+    with pytest.raises(ValueError, match="no finite values"):
+        compute_losses(np.ones(2), np.full(2, np.nan))
+
+
+def test_compare_files_parallel_matches_serial(tmp_path):
+    rng = np.random.default_rng(4)
+    gt_dir, pred_dir = tmp_path / "gt", tmp_path / "pred"
+    gt_dir.mkdir()
+    pred_dir.mkdir()
+    files = [f"u_task{i}.npy" for i in range(MIN_FILES_PER_COMPARE_POOL + 2)]
+    for fname in files:
+        gt = rng.standard_normal((20, 20))
+        np.save(gt_dir / fname, gt)
+        np.save(pred_dir / fname, gt[::2, ::2] + 0.1)
+
+    serial = list(compare_files(files, str(gt_dir), str(pred_dir), max_workers=1))
+    parallel = list(compare_files(files, str(gt_dir), str(pred_dir), max_workers=4))
+    assert parallel == serial
+    assert [record["file"] for record in serial] == files
+    assert all(record["error"] is None for record in serial)
@@ -0,0 +1,114 @@
+import textwrap
+
+import pytest
+
+from utils import preflight_check, NO_CODE_EXTRACTED
+
+
+def check(tmp_path, source, save_values=None, name="heat.py"):
+    script = tmp_path / name
+    script.write_text(textwrap.dedent(source))
+    return preflight_check(str(script), save_values)
+
+
+def test_valid_script_passes(tmp_path):
+    assert check(tmp_path, """
+        import numpy as np
+        from scipy.sparse import diags
+        u = np.zeros(10)
+        np.save("u.npy", u)
+    """, ["u"]) is None
+
+
+def test_no_code_extracted(tmp_path):
+    assert check(tmp_path, NO_CODE_EXTRACTED).startswith("No Python code was found")
+
+
+def test_syntax_error(tmp_path):
+    feedback = check(tmp_path, "import numpy as np\nu = np.zeros(10\n")
+    assert feedback.startswith("SyntaxError:")
+    assert "line 2" in feedback
+
+
+def test_missing_import(tmp_path):
+    feedback = check(tmp_path, """
+        import numpy as np
+        import not_a_real_module
+        from another_missing.sub import thing
+    """)
+    assert feedback.startswith("ModuleNotFoundError: No module named 'not_a_real_module', 'another_missing.sub'")
+
+
+def test_local_module_import(tmp_path):
+    (tmp_path / "helpers.py").write_text("")
+    assert check(tmp_path, "import helpers\n") is None
+
+
+@pytest.mark.parametrize("handler", ["ImportError", "ModuleNotFoundError", "(ImportError, OSError)", "Exception", ""])
+def test_guarded_import_is_optional(tmp_path, handler):
+    assert check(tmp_path, f"""
+        try:
+            import not_a_real_module
+        except {handler}:
+            not_a_real_module = None
+    """) is None
+
+
+def test_import_outside_the_guarded_body_is_required(tmp_path):
+    feedback = check(tmp_path, """
+        try:
+            import numpy as np
+        except ValueError:
+            import not_a_real_module
+        try:
+            import scipy
+        except ImportError:
+            import another_missing
+    """)
+    assert feedback.startswith("ModuleNotFoundError: No module named 'not_a_real_module', 'another_missing'")
+
+
+def test_import_inside_a_function_is_checked(tmp_path):
+    feedback = check(tmp_path, """
+        def plot():
+            import not_a_real_module
+    """)
+    assert feedback.startswith("ModuleNotFoundError")
+
+
+def test_unsaved_value(tmp_path):
+    feedback = check(tmp_path, """
+        import numpy as np
+        u = np.zeros(10)
+        v = np.zeros(10)
+        np.save("u.npy", u)
+    """, ["u", "v"])
+    assert feedback.startswith("The code never saves v.")
+
+
+def test_save_values_named_after_the_file(tmp_path):
+    source = """
+        import numpy as np
+        u_next = np.zeros(10)
+        np.save("u_final.npy", u_next)
+    """
+    # Saved as u_final_<task>.npy, which the comparison of u does not find
+    assert check(tmp_path, source, ["u"]).startswith("The code never saves u.")
+    assert check(tmp_path, source, ["u_final"]) is None
+
+
+def test_savez_keywords_and_task_suffix(tmp_path):
+    assert check(tmp_path, """
+        import numpy as np
+        u = v = np.zeros(10)
+        np.savez("fields.npz", u=u, v=v)
+        np.save("p_heat.npy", u)
+    """, ["u", "v", "p"]) is None
+
+
+def test_runtime_file_name_is_not_checked(tmp_path):
+    assert check(tmp_path, """
+        import numpy as np
+        for name in ["u", "v"]:
+            np.save(f"{name}.npy", np.zeros(10))
+    """, ["u", "v"]) is None
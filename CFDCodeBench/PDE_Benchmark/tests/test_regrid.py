@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from scipy.ndimage import zoom
+
+from utils import regrid, interpolate_to_match, get_regrid_operator
+
+
+def zoom_to(array, target_shape):
+    # The original interpolate_to_match
+    factors = np.array(target_shape) / np.array(array.shape)
+    return zoom(array, factors, order=1)
+
+
+@pytest.mark.parametrize("source_shape, target_shape", [
+    ((50,), (101,)),
+    ((101,), (50,)),
+    ((41, 41), (81, 61)),
+    ((64, 32), (32, 64)),
+    ((10, 12, 8), (20, 6, 8)),
+])
+def test_node_regrid_matches_zoom(source_shape, target_shape):
+    array = np.random.default_rng(0).standard_normal(source_shape)
+    np.testing.assert_allclose(regrid(array, target_shape), zoom_to(array, target_shape), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_regrid_keeps_the_input_dtype(dtype):
+    array = np.random.default_rng(1).standard_normal((41, 41)).astype(dtype)
+    resized = regrid(array, (81, 81))
+    assert resized.dtype == dtype
+    np.testing.assert_allclose(resized, zoom_to(array, (81, 81)), rtol=1e-6, atol=1e-6)
+
+
+def test_regrid_is_exact_for_linear_fields():
+    # Linear interpolation reproduces a linear field on every layout, sampled at the target points
+    for grid_type, points in [("node", lambda n: np.linspace(0, 1, n)),
+                              ("cell", lambda n: (np.arange(n) + 0.5) / n)]:
+        source, target = points(20), points(45)
+        resized = regrid(3 * source + 1, (45,), grid_type)
+        inside = (target >= source[0]) & (target <= source[-1])
+        np.testing.assert_allclose(resized[inside], 3 * target[inside] + 1, rtol=1e-12)
+
+
+def test_periodic_regrid_wraps_around():
+    source = np.linspace(0, 2 * np.pi, 32, endpoint=False)
+    target = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    resized = regrid(np.sin(source), (64,), "periodic")
+    np.testing.assert_allclose(resized[::2], np.sin(source), atol=1e-12)
+    # The last target point lies between the last source point and the first one
+    np.testing.assert_allclose(resized[-1], 0.5 * np.sin(source[-1]), atol=1e-12)
+    np.testing.assert_allclose(resized, np.sin(target), atol=1e-2)
+
+
+def test_regrid_operator_is_cached():
+    assert get_regrid_operator((30, 30), (60, 60), "node") is get_regrid_operator((30, 30), (60, 60), "node")
+
+
+def test_regrid_rejects_invalid_grids():
+    with pytest.raises(ValueError, match="Unknown grid type"):
+        regrid(np.ones(10), (20,), "staggered")
+    with pytest.raises(ValueError, match="Cannot regrid"):
+        regrid(np.ones(10), (20, 20))
+
+
+def test_interpolate_to_match_returns_same_shape_unchanged():
+    gt, pred = np.zeros((8, 8)), np.ones((8, 8))
+    assert interpolate_to_match(gt, pred) is pred
@@ -0,0 +1,82 @@
+import ast
+import os
+import textwrap
+
+import pytest
+
+from solver_worker import BoundedOutput, run_subprocess
+from utils import get_saved_names, NUMPY_SAVE_FUNCTIONS
+
+
+def write_lines(output, n_lines, chunk_size=7):
+    data = b"".join(f"line {i:03d}\n".encode() for i in range(n_lines))
+    for start in range(0, len(data), chunk_size):
+        output.write(data[start:start + chunk_size])
+    return data
+
+
+def test_bounded_output_keeps_short_output():
+    output = BoundedOutput(max_bytes=1024)
+    data = write_lines(output, 10)
+    assert output.getvalue() == data
+    assert output.dropped() == (0, 0)
+
+
+def test_bounded_output_keeps_head_and_tail_lines():
+    output = BoundedOutput(max_bytes=100)
+    data = write_lines(output, 100)
+    lines = data.splitlines(keepends=True)
+
+    dropped_lines, dropped_bytes = output.dropped()
+    value = output.getvalue()
+    head, marker, tail = value.partition(b"... [")
+    marker, _, tail = tail.partition(b"] ...\n")
+    # Whole lines only, from the start and the end of the stream
+    assert head == b"".join(lines[:len(head.splitlines())])
+    assert tail == b"".join(lines[len(lines) - len(tail.splitlines()):])
+    assert len(head) <= 50 and len(tail) <= 50
+    assert marker == f"{dropped_lines} lines ({dropped_bytes} bytes) of output dropped".encode()
+    assert dropped_bytes == len(data) - len(head) - len(tail)
+    assert dropped_lines == len(lines) - len(head.splitlines()) - len(tail.splitlines())
+
+
+SAVE_CASES = {
+    "literal file name": ("np.save('u.npy', u_next)", {"u"}),
+    "file name without extension": ("np.save('u', u_next)", {"u"}),
+    "file name with the task": ("np.save('u_heat.npy', u_next)", {"u"}),
+    "joined path": ("np.save(os.path.join(out, 'u.npy'), u_next)", {"u"}),
+    "f-string path": ("np.save(f'u_{nx}.npy', u)", {"u"}),
+    "f-string path of an expression": ("np.save(f'u_{nx}.npy', u_next * 2)", {"u_41"}),
+    "keyword arguments": ("np.save(file='u.npy', arr=u_next)", {"u"}),
+    "expression": ("np.save('u.npy', u_next[1:-1] * 2)", {"u"}),
+    "aliased array": ("u = u_next\nnp.save('v.npy', u)", {"v"}),
+    "aliased array with a runtime name": ("u = u_next\nnp.save(f'u_{nx}.npy', u)", {"u_41"}),
+    "savez keywords": ("np.savez('fields.npz', u=u_next, v=v)", {"u", "v"}),
+    "savez positional arrays": ("np.savez('fields.npz', u, v)", {"u", "v"}),
+    "savez single positional array": ("np.savez_compressed('u.npz', u_next)", {"u"}),
+    "savez unnamed positional arrays": ("np.savez('fields.npz', u_next + 1, v)", {"arr_0", "v"}),
+}
+
+
+@pytest.mark.parametrize("save_call, expected", SAVE_CASES.values(), ids=SAVE_CASES.keys())
+def test_save_hook_output_names(tmp_path, save_call, expected):
+    script = tmp_path / "heat.py"
+    script.write_text(textwrap.dedent("""
+        import os
+        import numpy as np
+        nx = 41
+        out = "results"
+        u_next = np.linspace(0, 1, nx)
+        v = np.zeros(nx)
+        u = u_next.copy()
+    """) + save_call + "\n")
+    output_dir = tmp_path / "prediction"
+
+    result = run_subprocess(str(script), timeout=30, cwd=str(tmp_path), output_dir=str(output_dir))
+    assert result.returncode == 0, result.stderr
+    assert set(os.listdir(output_dir)) == {f"{var}_heat.npy" for var in expected}
+    # The pre-flight check expects the same names, unless they are only known at runtime
+    tree = ast.parse(script.read_text())
+    call = [node for node in ast.walk(tree) if isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute) and node.func.attr in NUMPY_SAVE_FUNCTIONS][0]
+    assert get_saved_names(call, "heat") in (expected, None)
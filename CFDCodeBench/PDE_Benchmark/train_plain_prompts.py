@@ -1,56 +1,97 @@
-from utils import PromptGenerator, LLMCodeGenerator, SolverPostProcessor, ConvergentTest
+from utils import PromptGenerator, LLMCodeGenerator, SolverPostProcessor, ConvergentTest, DivergenceWatchdog, \
+    GenerationPipeline, run_model_sweep
 import os
 
-# STEP 1: generate the prompts
-# Set the root directory (you can also use os.getcwd() if running from root)
-ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-root_dir = os.path.join(ROOT_DIR, 'PDE_Benchmark')  # PDE_Benchmark root
-json_file = "prompts.json"  # do not use mms
-# json_file = "mms_prompts.json"  # use mms
-# Initialize the PromptGenerator
-generator_prompt = PromptGenerator(root_dir, json_file)
-
-# Load the problem data from the input JSON
-generator_prompt.load_problem_data()
-
-# Create prompts from the data
-prompts = generator_prompt.create_prompts()
-
-# Save to prompts.json (will skip if already exists)
-generator_prompt.save_prompts(prompts)
-
-# STEP 2: call LLM API to get generated code
-# Set the model and prompt JSON filename
-# llm_model = "gemini"  # "gpt-4o", ""o3-mini, "sonnet-3.5", "haiku", "lama 4", "gemini: gemini-2.0-flash"
-# List of LLM models to evaluate
-llm_models = [
-    "gpt-4o",
-    "o3-mini",
-    "gemini",
-    "sonnet-35",
-    "haiku",
-]
-
-# use gpt-4o to check the code
-# llm_models = ["o3-mini"]
-prompt_json = json_file  # the file under ./prompt/
-# Loop over all models
-for llm_model in llm_models:
-    print(f"\n=== Running for model: {llm_model} ===\n")
-    print(f"\n=== Running for prompt: {json_file} ===")
-    # # Instantiate the class
-    # generator_llm = LLMCodeGenerator(llm_model, prompt_json)
-    #
-    # # Call the API to generate code for each task
-    # generator_llm.call_api()
-
-    # STEP 3: post-process the generate code and compare the loss and images
-    # Create the post-processor
-    processor = SolverPostProcessor(llm_model, prompt_json)
-
-    # Run the full post-processing pipeline
-    # this time only run execute LLM generated python code and save the results to log file
-    # processor.run_all()
-
-    convergent_processor = ConvergentTest(llm_model, prompt_json)
-    convergent_processor.run()
+
+if __name__ == "__main__":
+    # Guarded so the worker processes started with forkserver / spawn can import this script without running it
+    # STEP 1: generate the prompts
+    # Set the root directory (you can also use os.getcwd() if running from root)
+    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    root_dir = os.path.join(ROOT_DIR, 'PDE_Benchmark')  # PDE_Benchmark root
+    json_file = "prompts.json"  # do not use mms
+    # json_file = "mms_prompts.json"  # use mms
+    # Initialize the PromptGenerator
+    generator_prompt = PromptGenerator(root_dir, json_file)
+
+    # Load the problem data from the input JSON
+    generator_prompt.load_problem_data()
+
+    # Create prompts from the data
+    prompts = generator_prompt.create_prompts()
+
+    # Save to prompts.json (will skip if already exists)
+    generator_prompt.save_prompts(prompts)
+
+    # STEP 2: call LLM API to get generated code
+    # Set the model and prompt JSON filename
+    # llm_model = "gemini"  # "gpt-4o", ""o3-mini, "sonnet-3.5", "haiku", "lama 4", "gemini: gemini-2.0-flash"
+    # List of LLM models to evaluate
+    llm_models = [
+        "gpt-4o",
+        "o3-mini",
+        "gemini",
+        "sonnet-35",
+        "haiku",
+    ]
+
+    # use gpt-4o to check the code
+    # llm_models = ["o3-mini"]
+    prompt_json = json_file  # the file under ./prompt/
+    # number of generated solvers executed in parallel (None uses all CPU cores)
+    max_workers = None
+    # reuse the execution results of solvers that did not change since the last run
+    use_cache = True
+    # fork the solvers from warm interpreters with numpy/scipy/matplotlib already imported
+    warm_pool = True
+    # stop runaway solvers early: over 8GB of memory, or memory growing by more than 500MB/s for 5 seconds
+    # (detect_fp_errors=True also stops them on the first floating point overflow, off by default; None disables it)
+    watchdog = DivergenceWatchdog(max_rss_mb=8000, max_rss_growth_mb_per_s=500)
+    # run the models at the same time, each in its own process with its own log files and token counters
+    # (the models then share the CPU cores: max_workers is capped to the share of each model)
+    parallel_models = True
+    # grid layout of the arrays of each task ("node", "cell" or "periodic", node when not listed), used to regrid
+    # predictions saved at another resolution than the ground truth, e.g. {"1D_Euler_Shock_Tube": "cell"}
+    grid_types = {}
+    processor_kwargs = dict(max_workers=max_workers, use_cache=use_cache, warm_pool=warm_pool, watchdog=watchdog,
+                            grid_types=grid_types)
+
+    if parallel_models:
+        # generate=True calls the LLM APIs (LLMCodeGenerator.call_api_concurrent),
+        # post_process=True runs the full post-processing pipeline (SolverPostProcessor.run_all)
+        run_model_sweep(llm_models, prompt_json, generate=False, post_process=False, convergent=True,
+                        processor_kwargs=processor_kwargs)
+    else:
+        # Loop over all models
+        for llm_model in llm_models:
+            print(f"\n=== Running for model: {llm_model} ===\n")
+            print(f"\n=== Running for prompt: {json_file} ===")
+            # # Instantiate the class
+            # # (response_cache="read_write" reuses the responses of identical conversations,
+            # # "replay" never calls the API)
+            # # (compact_context=True only resends the prompt, the latest code and its trimmed error on each retry)
+            # # (stream=True stops reading each completion once its first code block is closed)
+            # generator_llm = LLMCodeGenerator(llm_model, prompt_json)
+            #
+            # # Call the API to generate code for each task
+            # generator_llm.call_api()
+            # # or run the task conversations concurrently (max_concurrency, per-provider rate limits)
+            # generator_llm.call_api_concurrent()
+            # # or submit the first turns as one batch job (OpenAI Batch / Bedrock batch inference),
+            # # then repair interactively
+            # generator_llm.call_api_batch()
+            # # or execute and score each task as soon as its code is generated
+            # GenerationPipeline(generator_llm, SolverPostProcessor(llm_model, prompt_json)).run()
+
+            # STEP 3: post-process the generate code and compare the loss and images
+            # Create the post-processor
+            processor = SolverPostProcessor(llm_model, prompt_json, max_workers=max_workers, use_cache=use_cache,
+                                            warm_pool=warm_pool, watchdog=watchdog, grid_types=grid_types)
+
+            # Run the full post-processing pipeline
+            # this time only run execute LLM generated python code and save the results to log file
+            # processor.run_all()
+
+            convergent_processor = ConvergentTest(llm_model, prompt_json, max_workers=max_workers, use_cache=use_cache,
+                                                  warm_pool=warm_pool, watchdog=watchdog, grid_types=grid_types)
+            convergent_processor.run()
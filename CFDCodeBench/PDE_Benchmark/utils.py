@@ -2,12 +2,14 @@ import json
 import re
 import subprocess
 import boto3
+from botocore.response import StreamingBody
+from botocore.config import Config as BotocoreConfig
 from openai import OpenAI
+from openai.types.chat import ChatCompletion
 import logging
+import logging.handlers
 from datetime import datetime
-from scipy.ndimage import zoom
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse
 import os
 import numpy as np
 import cv2
@@ -16,9 +18,25 @@ from skimage.metrics import peak_signal_noise_ratio as psnr
 import pandas as pd
 import matplotlib.pyplot as plt
 import ast
+import contextlib
+import threading
+import importlib.util
+import functools
+import itertools
 import shutil
-# from google import genai
-# from google.genai import types
+import sys
+import time
+import hashlib
+import tempfile
+import scipy
+import asyncio
+import io
+import queue
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from solver_worker import (WarmWorkerPool, SolverResult, DivergenceWatchdog, run_subprocess, get_file_stem,
+                           SOLVER_PYTHON, MAX_OUTPUT_BYTES)
+# google-genai is only imported by the gemini code paths (from google import genai, from google.genai import types)
 
 
 def generate_prompt(data):
@@ -125,24 +143,42 @@ class PromptGenerator:
 
 
 # === Function to Execute Python Script and Capture Errors and Warnings ===
-def execute_python_script(filepath, timeout=60):
+def execute_python_script(filepath, timeout=60, pool=None, max_output_bytes=MAX_OUTPUT_BYTES, watchdog=None,
+                          output_dir=None, log=logging):
     try:
-        result = subprocess.run(["python3", filepath], capture_output=True, text=True, timeout=timeout)
+        # stdout / stderr are streamed into head + tail buffers capped at max_output_bytes each
+        # the optional watchdog stops solvers that blow up (overflow, runaway memory) before the timeout
+        # with output_dir, the np.save / np.savez calls of the script are routed to <output_dir>/<var>_<task>.npy
+        if pool is not None:
+            # Fork the script from a warm interpreter with the scientific modules already imported
+            result = pool.run(filepath, timeout=timeout, max_output_bytes=max_output_bytes, watchdog=watchdog,
+                              output_dir=output_dir)
+        else:
+            result = run_subprocess(filepath, timeout=timeout, max_output_bytes=max_output_bytes, watchdog=watchdog,
+                                    output_dir=output_dir)
         stderr_output = result.stderr.strip()
 
+        if result.status == "diverged":
+            log.error(f"Execution diverged ({result.status_reason}):\n{stderr_output}")
+            return f"❌ The solver diverged and was stopped early: {result.status_reason}\n{stderr_output}", result
+
         if result.returncode == 0:
             if "warning" in stderr_output.lower():
-                logging.warning(f"Execution completed with warnings:\n{stderr_output}")
+                log.warning(f"Execution completed with warnings:\n{stderr_output}")
                 return f"⚠️ Execution completed with warnings:\n{stderr_output}", result
             else:
-                logging.info("Execution successful, no errors detected.")
+                log.info("Execution successful, no errors detected.")
                 return "Execution successful, no errors detected.", result
 
-        logging.error(f"Execution failed with errors:\n{stderr_output}")
+        log.error(f"Execution failed with errors:\n{stderr_output}")
         return stderr_output, result
 
+    except subprocess.TimeoutExpired as e:
+        # Returned as the result, so the logs and records report a timeout rather than an unexpected error
+        log.error(f"❌ Script {filepath} timed out after {timeout} seconds")
+        return f"❌ Execution timed out after {timeout} seconds.", e
     except Exception as e:
-        logging.error(f"❌ Unexpected error while running script {filepath}: {e}")
+        log.error(f"❌ Unexpected error while running script {filepath}: {e}")
         return f"❌ Unexpected error: {e}", None
 
 
@@ -190,6 +226,27 @@ def build_conversation(original_prompt, llm_model):
     return conversation_history
 
 
+def compact_conversation(llm_model, original_prompt, conversation_history, model_response, feedback=""):
+    # Next repair context: the prompt, the latest code and its feedback, plus the last error line of older attempts
+    compacted = build_conversation(original_prompt, llm_model)
+    if llm_model == "gemini":
+        # The gemini history is a single string, only the latest response and its feedback are kept
+        return compacted + model_response + feedback
+    older_turns = conversation_history[len(compacted):-2]
+    latest_turns = [dict(turn) for turn in conversation_history[-2:]]
+    earlier_errors = []
+    for turn in older_turns:
+        if turn["role"] == "user":
+            error_lines = [line for line in turn["content"].splitlines()
+                           if line.strip() and line != "Please correct it."]
+            if error_lines:
+                earlier_errors.append(error_lines[-1].strip())
+    if earlier_errors and latest_turns[-1]["role"] == "user":
+        summary = "\n".join(f"- {error}" for error in earlier_errors)
+        latest_turns[-1]["content"] = f"[Earlier attempts failed with]:\n{summary}\n{latest_turns[-1]['content']}"
+    return compacted + latest_turns
+
+
 def extract_model_response(llm_model, response):
     # Extract model response
     if llm_model in ["gpt-4o", "o3-mini"]:
@@ -211,7 +268,7 @@ def extract_model_response(llm_model, response):
     return model_response
 
 
-def update_token_usage(llm_model, response, tokens_counts):
+def update_token_usage(llm_model, response, tokens_counts, log=logging):
     if llm_model == "gpt-4o":
         usage = response.usage
         tokens_counts['total_input_tokens'] += usage.prompt_tokens
@@ -261,11 +318,15 @@ def update_token_usage(llm_model, response, tokens_counts):
         raise ValueError(f"Unsupported model type: {llm_model}")
 
     # Log summary
-    logging.info(f"[{llm_model}] Input Tokens: {tokens_counts['total_input_tokens']}, "
+    log.info(f"[{llm_model}] Input Tokens: {tokens_counts['total_input_tokens']}, "
                  f"Output Tokens: {tokens_counts['total_output_tokens']}, "
                  f"Estimated Cost: ${tokens_counts['total_cost']:.4f}")
 
 
+# Placeholder written instead of a script when a response has no code
+NO_CODE_EXTRACTED = "# No valid Python code extracted"
+
+
 def extract_code(model_response):
     # Match ```python ...``` or ```...``` code blocks
     code_blocks = re.findall(r"```(?:python)?\s*(.*?)```", model_response, re.DOTALL)
@@ -289,7 +350,7 @@ def extract_code(model_response):
     if python_lines:
         return "\n".join(python_lines).strip()
 
-    return "# No valid Python code extracted"
+    return NO_CODE_EXTRACTED
 
 
 def save_model_outputs(task_name, output_folder, model_response):
@@ -312,30 +373,293 @@ def save_model_outputs(task_name, output_folder, model_response):
     return script_path
 
 
-def execute_check_errors(llm_model, script_path, task_name, conversation_history):
-    # Execute and check for errors
-    execution_feedback, _ = execute_python_script(script_path)
+# The NumPy save calls the solver_worker save hook intercepts (the comparisons only read .npy files, so np.savetxt
+# does not count as saving a variable)
+NUMPY_SAVE_FUNCTIONS = ("save", "savez", "savez_compressed")
+
+
+@functools.lru_cache(maxsize=None)
+def module_available(module_name):
+    # Resolve a top-level module without importing it, in this interpreter's environment which is the one the
+    # solvers run with (solver_worker.SOLVER_PYTHON)
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# Exceptions whose handler makes a failing import optional, e.g. `try: import numba except ImportError: numba = None`
+IMPORT_ERROR_HANDLERS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+
+def handles_import_error(handler):
+    if handler.type is None:
+        return True
+    types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    return any(isinstance(t, ast.Name) and t.id in IMPORT_ERROR_HANDLERS or
+               isinstance(t, ast.Attribute) and t.attr in IMPORT_ERROR_HANDLERS for t in types)
+
+
+def get_required_imports(tree):
+    # Import / ImportFrom nodes of a script that are not guarded by a try whose handlers catch the ImportError
+    nodes = [tree]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+        elif isinstance(node, ast.Try) and any(
+                handles_import_error(handler) for handler in node.handlers):
+            # Only the guarded body is optional, the handlers and the else / finally blocks still run unguarded
+            nodes.extend([*node.handlers, *node.orelse, *node.finalbody][::-1])
+        else:
+            nodes.extend(list(ast.iter_child_nodes(node))[::-1])
+
+
+def get_literal_file_stem(node):
+    # Stem of the last string of a file argument, e.g. "u" for "u.npy" or os.path.join(out, "u.npy"), None when that
+    # name is built at runtime (f-string placeholders, no literal)
+    strings = []
+    nodes = [node]
+    while nodes:
+        child = nodes.pop()
+        if isinstance(child, ast.JoinedStr) or (isinstance(child, ast.Constant) and isinstance(child.value, str)):
+            strings.append(child)
+        else:
+            nodes.extend(ast.iter_child_nodes(child))
+    if not strings:
+        return None
+    last = max(strings, key=lambda child: (child.lineno, child.col_offset))
+    if isinstance(last, ast.JoinedStr):
+        if any(isinstance(value, ast.FormattedValue) for value in last.values):
+            return None
+        return get_file_stem("".join(value.value for value in last.values))
+    return get_file_stem(last.value)
+
+
+def get_saved_names(call, task=None):
+    # <var> names the save hook gives the arrays of a NumPy save call (see solver_worker.get_output_var), None when
+    # they are only known at runtime
+    arguments = list(call.args)
+    keywords = {keyword.arg: keyword.value for keyword in call.keywords if keyword.arg}
+    file_node = arguments.pop(0) if arguments else keywords.pop("file", None)
+    if file_node is None:
+        return None
+    stem = get_literal_file_stem(file_node)
+    if stem is not None and task and stem.endswith(f"_{task}"):
+        return {stem[:-len(task) - 1]}
+
+    names = {name for name in keywords if name != "allow_pickle"} if call.func.attr != "save" else set()
+    if call.func.attr == "save" or (len(arguments) == 1 and not names):
+        # A single array is named after a literal file name, or else after the object saved at runtime
+        return {stem} if stem is not None else None
+    for i, node in enumerate(arguments):
+        names.add(node.id if isinstance(node, ast.Name) else f"arr_{i}")
+    return names
+
+
+def preflight_check(script_path, save_values=None):
+    # Checks before running a script: code extracted, parses, imports resolve, save_values saved
+    # (feedback for the repair loop, None if the script should run)
+    with open(script_path, "r") as f:
+        code = f.read()
+    if code.strip() == NO_CODE_EXTRACTED:
+        return "No Python code was found in the response. Return the complete solver in a ```python code block."
+
+    try:
+        tree = ast.parse(code, filename=script_path)
+    except SyntaxError as e:
+        return f"SyntaxError: {e.msg} (line {e.lineno})\n{(e.text or '').rstrip()}"
+
+    script_dir = os.path.dirname(os.path.abspath(script_path))
+    task = os.path.splitext(os.path.basename(script_path))[0]
+    missing_modules = []
+    for node in get_required_imports(tree):
+        if isinstance(node, ast.Import):
+            module_names = [alias.name for alias in node.names]
+        elif node.level == 0 and node.module:
+            module_names = [node.module]
+        else:
+            continue
+        for module_name in module_names:
+            top_level = module_name.split(".")[0]
+            local = os.path.exists(os.path.join(script_dir, f"{top_level}.py"))
+            if not local and not module_available(top_level) and module_name not in missing_modules:
+                missing_modules.append(module_name)
+    if missing_modules:
+        return (f"ModuleNotFoundError: No module named {', '.join(repr(m) for m in missing_modules)}. "
+                f"Only use packages available in the environment (e.g. numpy, scipy, matplotlib).")
+
+    if save_values:
+        saved_names = set()
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in NUMPY_SAVE_FUNCTIONS):
+                names = get_saved_names(node, task)
+                if names is None:
+                    # A file name built at runtime may save any of them
+                    return None
+                saved_names |= names
+        unsaved = [var for var in save_values if var not in saved_names]
+        if unsaved:
+            return (f"The code never saves {', '.join(unsaved)}. Save every requested variable at the final time "
+                    f"step, e.g. np.save('{unsaved[0]}.npy', {unsaved[0]}).")
+    return None
+
+
+# Lines of error output sent back to the model when the repair context is compacted
+FEEDBACK_MAX_LINES = 30
+
+
+def trim_feedback(feedback, max_lines=None):
+    # Keep the first line (the kind of failure) and the last lines of a long traceback / warning dump
+    lines = feedback.splitlines()
+    if max_lines is None or len(lines) <= max_lines:
+        return feedback
+    omitted = len(lines) - max_lines
+    return "\n".join([lines[0], f"... ({omitted} lines omitted) ...", *lines[-(max_lines - 1):]])
+
+
+def execute_check_errors(llm_model, script_path, task_name, conversation_history, pool=None, watchdog=None,
+                         log=logging, save_values=None, max_feedback_lines=None):
+    # None when the script ran cleanly, otherwise the feedback prompt for the next attempt (already appended to a
+    # list history, the gemini string history is extended by the caller)
+    # Pre-flight checks first: their feedback goes to the repair loop without running the script
+    execution_feedback = preflight_check(script_path, save_values)
+    if execution_feedback is not None:
+        log.info(f"Pre-flight check failed for {task_name}, skipping the execution")
+    else:
+        # Execute and check for errors
+        execution_feedback, _ = execute_python_script(script_path, pool=pool, watchdog=watchdog, log=log)
 
     if "no errors detected" in execution_feedback:
         print(f"🎯 {task_name} executed successfully without syntax errors.")
-        logging.info(f"🎯 {task_name} executed successfully without syntax errors.")
-        return True  # Exit function if no errors
+        log.info(f"🎯 {task_name} executed successfully without syntax errors.")
+        return None  # Exit function if no errors
 
     else:
         print(f"❌ Error detected in {task_name}, refining prompt...")
-        logging.info(f"❌ Error detected in {task_name}, refining prompt...")
-        logging.info(
+        log.info(f"❌ Error detected in {task_name}, refining prompt...")
+        log.info(
             f"\n\n[Feedback]: The previous generated code had the following error:\n{execution_feedback}\nPlease correct it.")
+        # The log keeps the full output, the model only gets the trimmed one
+        execution_feedback = trim_feedback(execution_feedback, max_feedback_lines)
         updated_prompt = f"[Feedback]: The previous generated code had the following error:\n{execution_feedback}\nPlease correct it."
 
         # Add the refine prompt feedback to the conversation as input
-        if llm_model == "gemini":
-            conversation_history += updated_prompt
-        else:
+        if llm_model != "gemini":
             conversation_history.append({"role": "user", "content": updated_prompt})
+        return updated_prompt
+
+
+def serialize_llm_response(llm_model, response):
+    # JSON-able form of a provider response, from which deserialize_llm_response rebuilds the same response shape
+    if llm_model in ["gpt-4o", "o3-mini"]:
+        return response.model_dump(mode="json")
+    elif llm_model in ["sonnet-35", "haiku"]:
+        # The body is a stream that can only be read once
+        return {"body": response["body"].read().decode("utf-8"), "contentType": response.get("contentType")}
+    elif llm_model == "gemini":
+        return response.model_dump(mode="json", exclude_none=True)
+    else:
+        raise ValueError(f"Unsupported model type: {llm_model}")
 
 
-def call_llm_api(llm_model, client, conversation_history, temperature, bedrock_runtime, inference_profile_arn):
+def deserialize_llm_response(llm_model, data):
+    if llm_model in ["gpt-4o", "o3-mini"]:
+        return ChatCompletion.model_validate(data)
+    elif llm_model in ["sonnet-35", "haiku"]:
+        body = data["body"].encode("utf-8")
+        return {"body": StreamingBody(io.BytesIO(body), len(body)), "contentType": data.get("contentType")}
+    elif llm_model == "gemini":
+        from google.genai import types as genai_types
+        return genai_types.GenerateContentResponse.model_validate(data)
+    else:
+        raise ValueError(f"Unsupported model type: {llm_model}")
+
+
+class LLMCacheMissError(RuntimeError):
+    pass
+
+
+class LLMResponseCache:
+    # On-disk LLM responses keyed by provider, model, temperature, conversation and streaming; mode="replay" raises
+    # LLMCacheMissError instead of calling the API
+    MODES = ("read_write", "replay")
+
+    def __init__(self, cache_dir, mode="read_write"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported cache mode: {mode}, expected one of {self.MODES}")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, llm_model, temperature, conversation_history, stream=False):
+        request = {
+            "provider": get_provider(llm_model),
+            "model": llm_model,
+            "temperature": temperature,
+            "conversation": conversation_history,
+        }
+        if stream:
+            # A streamed response is cut after its first code block and its usage may be estimated, so it never
+            # answers a full request (and the other way round)
+            request["stream"] = "first_code_block"
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def load(self, llm_model, key):
+        path = self.entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            return deserialize_llm_response(llm_model, entry["response"])
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable LLM cache entry {path}: {e}")
+            return None
+
+    def store(self, llm_model, key, temperature, conversation_history, response):
+        # Returns a response that can still be read by the caller (reading a Bedrock body consumes it)
+        data = serialize_llm_response(llm_model, response)
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"model": llm_model, "temperature": temperature, "conversation": conversation_history,
+                           "response": data}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logging.warning(f"Failed to cache the LLM response in {path}: {e}")
+        return deserialize_llm_response(llm_model, data)
+
+
+def call_llm_api(llm_model, client, conversation_history, temperature, bedrock_runtime, inference_profile_arn,
+                 cache=None, stream=False, log=logging):
+    # With a response cache, the same conversation is answered from disk (and never sent in replay mode)
+    # With stream, the completion is streamed and cut after its first code block (see stream_llm_api)
+    send_request = functools.partial(stream_llm_api, log=log) if stream else request_llm_api
+    if cache is not None:
+        key = cache.make_key(llm_model, temperature, conversation_history, stream)
+        response = cache.load(llm_model, key)
+        if response is not None:
+            log.info(f"LLM response cache hit ({key})")
+            return response
+        if cache.mode == "replay":
+            raise LLMCacheMissError(f"No cached response for this {llm_model} conversation ({key}) in replay mode")
+        response = send_request(llm_model, client, conversation_history, temperature, bedrock_runtime,
+                                inference_profile_arn)
+        return cache.store(llm_model, key, temperature, conversation_history, response)
+    return send_request(llm_model, client, conversation_history, temperature, bedrock_runtime, inference_profile_arn)
+
+
+def request_llm_api(llm_model, client, conversation_history, temperature, bedrock_runtime, inference_profile_arn):
     if llm_model == "o3-mini":
         # Call OpenAI o3-mini API
         response = client.chat.completions.create(
@@ -365,10 +689,11 @@ def call_llm_api(llm_model, client, conversation_history, temperature, bedrock_r
             accept="application/json"
         )
     elif llm_model == "gemini":
+        from google.genai import types as genai_types
         response = client.models.generate_content(
             model="gemini-2.0-flash",
             contents=conversation_history,
-            config=types.GenerateContentConfig(
+            config=genai_types.GenerateContentConfig(
                 temperature=temperature,
                 system_instruction=build_system_prompt()
             )
@@ -378,27 +703,439 @@ def call_llm_api(llm_model, client, conversation_history, temperature, bedrock_r
     return response
 
 
+def get_code_block_end(text):
+    # End of the first closed ``` / ```python block, the one extract_code returns (None while it is still open)
+    match = re.search(r"```(?:python)?\s*(.*?)```", text, re.DOTALL)
+    return match.end() if match else None
+
+
+def read_until_code_block(pieces, close):
+    # Accumulate the streamed text until the first code block is closed, then cancel the rest of the stream
+    text = ""
+    for piece in pieces:
+        text += piece
+        end = get_code_block_end(text)
+        if end is not None:
+            close()
+            return text[:end], True
+    return text, False
+
+
+def iter_openai_stream(stream, usage):
+    for chunk in stream:
+        if chunk.usage is not None:
+            usage["input_tokens"], usage["output_tokens"] = chunk.usage.prompt_tokens, chunk.usage.completion_tokens
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def iter_bedrock_stream(event_stream, usage):
+    for event in event_stream:
+        if "chunk" not in event:
+            continue
+        chunk = json.loads(event["chunk"]["bytes"])
+        if chunk["type"] == "message_start":
+            usage["input_tokens"] = chunk["message"].get("usage", {}).get("input_tokens", 0)
+        elif chunk["type"] == "message_delta":
+            usage["output_tokens"] = chunk.get("usage", {}).get("output_tokens", 0)
+        elif chunk["type"] == "content_block_delta" and chunk["delta"].get("text"):
+            yield chunk["delta"]["text"]
+
+
+def iter_gemini_stream(stream, usage):
+    for chunk in stream:
+        if chunk.usage_metadata is not None and chunk.usage_metadata.prompt_token_count is not None:
+            usage["input_tokens"] = chunk.usage_metadata.prompt_token_count
+            usage["output_tokens"] = chunk.usage_metadata.candidates_token_count or 0
+        if chunk.text:
+            yield chunk.text
+
+
+def build_streamed_response(llm_model, text, usage, conversation_history):
+    # Response of the request_llm_api shape for a streamed completion, the usage is estimated if it was cancelled
+    input_tokens = usage.get("input_tokens") or estimate_tokens(conversation_history)
+    output_tokens = usage.get("output_tokens") or estimate_tokens(text)
+    if llm_model in ["gpt-4o", "o3-mini"]:
+        return ChatCompletion.model_validate({
+            "id": f"chatcmpl-stream-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": llm_model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                      "total_tokens": input_tokens + output_tokens},
+        })
+    elif llm_model in ["sonnet-35", "haiku"]:
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        body = json.dumps({"type": "message", "role": "assistant", "content": [{"type": "text", "text": text}],
+                           "stop_reason": "end_turn", "usage": usage}).encode("utf-8")
+        return {"body": StreamingBody(io.BytesIO(body), len(body)), "contentType": "application/json", "usage": usage}
+    elif llm_model == "gemini":
+        from google.genai import types as genai_types
+        return genai_types.GenerateContentResponse.model_validate({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finish_reason": "STOP"}],
+            "usage_metadata": {"prompt_token_count": input_tokens, "candidates_token_count": output_tokens,
+                               "total_token_count": input_tokens + output_tokens},
+        })
+    else:
+        raise ValueError(f"Unsupported model type: {llm_model}")
+
+
+def stream_llm_api(llm_model, client, conversation_history, temperature, bedrock_runtime, inference_profile_arn,
+                   log=logging):
+    # Streaming request_llm_api, cancelled as soon as the first python block is closed
+    usage = {}
+    if llm_model in ["gpt-4o", "o3-mini"]:
+        kwargs = {"temperature": temperature} if llm_model == "gpt-4o" else {}
+        stream = client.chat.completions.create(model=llm_model, messages=conversation_history, stream=True,
+                                                stream_options={"include_usage": True}, **kwargs)
+        pieces, close = iter_openai_stream(stream, usage), stream.close
+    elif llm_model in ["sonnet-35", "haiku"]:
+        request_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 8000,
+            "temperature": temperature,
+            "messages": conversation_history
+        }
+        response = bedrock_runtime.invoke_model_with_response_stream(
+            modelId=inference_profile_arn,
+            body=json.dumps(request_body),
+            contentType="application/json",
+            accept="application/json"
+        )
+        pieces, close = iter_bedrock_stream(response["body"], usage), response["body"].close
+    elif llm_model == "gemini":
+        from google.genai import types as genai_types
+        stream = client.models.generate_content_stream(
+            model="gemini-2.0-flash",
+            contents=conversation_history,
+            config=genai_types.GenerateContentConfig(
+                temperature=temperature,
+                system_instruction=build_system_prompt()
+            )
+        )
+        pieces, close = iter_gemini_stream(stream, usage), stream.close
+    else:
+        raise ValueError(f"Unsupported model type: {llm_model}")
+
+    text, cancelled = read_until_code_block(pieces, close)
+    if cancelled:
+        log.info(f"Stream of {llm_model} cancelled after the first code block ({len(text)} characters)")
+    return build_streamed_response(llm_model, text, usage, conversation_history)
+
+
+# Seconds between two status checks of a batch job, and the batch price relative to the interactive one
+BATCH_POLL_INTERVAL = 30
+BATCH_PRICE_FACTOR = 0.5
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled", "Completed", "PartiallyCompleted", "Failed",
+                           "Stopped", "Expired"}
+
+
+def wait_for_batch(get_status, job_id, poll_interval=BATCH_POLL_INTERVAL, log=logging):
+    # Poll a batch job until it reaches a terminal status and return that status
+    while True:
+        status = get_status()
+        log.info(f"Batch job {job_id}: {status}")
+        if status in BATCH_TERMINAL_STATUSES:
+            return status
+        time.sleep(poll_interval)
+
+
+def run_openai_batch(client, llm_model, conversations, temperature, poll_interval=BATCH_POLL_INTERVAL, log=logging):
+    # First turns as one OpenAI Batch job, returns {task_name: ChatCompletion} of the succeeded requests
+    lines = []
+    for task_name, conversation_history in conversations.items():
+        body = {"model": llm_model, "messages": conversation_history}
+        if llm_model == "gpt-4o":
+            body["temperature"] = temperature
+        lines.append(json.dumps({"custom_id": task_name, "method": "POST", "url": "/v1/chat/completions",
+                                 "body": body}))
+    input_file = client.files.create(file=("batch_input.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+    batch = client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                  completion_window="24h")
+    print(f"📦 Submitted OpenAI batch {batch.id} with {len(lines)} requests")
+    log.info(f"Submitted OpenAI batch {batch.id} with {len(lines)} requests")
+
+    status = wait_for_batch(lambda: client.batches.retrieve(batch.id).status, batch.id, poll_interval, log)
+    batch = client.batches.retrieve(batch.id)
+    responses = {}
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") is None and response.get("status_code") == 200:
+                responses[record["custom_id"]] = ChatCompletion.model_validate(response["body"])
+            else:
+                log.info(f"Batch request {record.get('custom_id')} failed: {record.get('error')}")
+    log.info(f"OpenAI batch {batch.id} {status}: {len(responses)}/{len(lines)} responses")
+    return responses
+
+
+def run_bedrock_batch(inference_profile_arn, conversations, temperature, s3_uri, role_arn,
+                      poll_interval=BATCH_POLL_INTERVAL, log=logging):
+    # First turns as one Bedrock batch inference job through s3_uri, returns {task_name: invoke_model-like response}
+    s3, bedrock = create_aws_client("s3"), create_aws_client("bedrock")
+    bucket, _, prefix = s3_uri.removeprefix("s3://").partition("/")
+    job_name = f"cfdllmbench-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    job_prefix = "/".join(part for part in [prefix.strip("/"), job_name] if part)
+    input_key, output_prefix = f"{job_prefix}/input.jsonl", f"{job_prefix}/output/"
+    records = [json.dumps({"recordId": task_name, "modelInput": {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 8000,
+        "temperature": temperature,
+        "messages": conversation_history
+    }}) for task_name, conversation_history in conversations.items()]
+    s3.put_object(Bucket=bucket, Key=input_key, Body="\n".join(records).encode("utf-8"))
+    job_arn = bedrock.create_model_invocation_job(
+        jobName=job_name,
+        roleArn=role_arn,
+        modelId=inference_profile_arn,
+        inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{bucket}/{input_key}"}},
+        outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{bucket}/{output_prefix}"}}
+    )["jobArn"]
+    print(f"📦 Submitted Bedrock batch {job_arn} with {len(records)} records")
+    log.info(f"Submitted Bedrock batch {job_arn} with {len(records)} records")
+
+    status = wait_for_batch(lambda: bedrock.get_model_invocation_job(jobIdentifier=job_arn)["status"], job_arn,
+                            poll_interval, log)
+    responses = {}
+    if status in ["Completed", "PartiallyCompleted"]:
+        # Bedrock writes the results to <output uri>/<job id>/<input file name>.out
+        output_key = f"{output_prefix}{job_arn.split('/')[-1]}/input.jsonl.out"
+        output = s3.get_object(Bucket=bucket, Key=output_key)["Body"].read().decode("utf-8")
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "modelOutput" in record and "error" not in record:
+                body = json.dumps(record["modelOutput"]).encode("utf-8")
+                responses[record["recordId"]] = {"body": StreamingBody(io.BytesIO(body), len(body)),
+                                                 "contentType": "application/json",
+                                                 "usage": record["modelOutput"].get("usage", {})}
+            else:
+                log.info(f"Batch record {record.get('recordId')} failed: {record.get('error')}")
+    log.info(f"Bedrock batch {job_arn} {status}: {len(responses)}/{len(records)} responses")
+    return responses
+
+
+class TranscriptLog:
+    # JSONL transcript of the conversations: only the turns that changed (content once per task, then its sha256),
+    # truncate records for compacted histories and one response record per attempt
+    def __init__(self, logger):
+        self.logger = logger
+        # sha256 of the turns written so far, by task and position, and of every content already written
+        self.written = {}
+        self.seen = set()
+        # The gemini history is one growing string, split into the parts appended to it
+        self.segments = {}
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        self.logger.info(json.dumps(record, ensure_ascii=False))
+
+    def get_turns(self, task_name, conversation_history):
+        if not isinstance(conversation_history, str):
+            return conversation_history
+        segments = self.segments.get(task_name, [])
+        previous = "".join(segments)
+        if conversation_history.startswith(previous):
+            if len(conversation_history) > len(previous):
+                segments = segments + [conversation_history[len(previous):]]
+        else:
+            segments = [conversation_history]
+        self.segments[task_name] = segments
+        return [{"role": "user", "content": segment} for segment in segments]
+
+    def record_turns(self, task_name, attempt, conversation_history):
+        with self._lock:
+            turns = self.get_turns(task_name, conversation_history)
+            written = self.written.setdefault(task_name, [])
+            if len(written) > len(turns):
+                del written[len(turns):]
+                self.write({"type": "truncate", "task": task_name, "attempt": attempt, "turns": len(turns)})
+            for index, turn in enumerate(turns):
+                digest = hashlib.sha256(f"{turn['role']}\0{turn['content']}".encode("utf-8")).hexdigest()
+                if index < len(written) and written[index] == digest:
+                    continue
+                record = {"type": "turn", "task": task_name, "attempt": attempt, "turn": index, "role": turn["role"],
+                          "sha256": digest}
+                if (task_name, digest) not in self.seen:
+                    self.seen.add((task_name, digest))
+                    record["content"] = turn["content"]
+                written[index:index + 1] = [digest]
+                self.write(record)
+
+    def record_response(self, task_name, attempt, llm_model, model_response, round_tokens_counts, batched=False):
+        self.write({"type": "response", "task": task_name, "attempt": attempt, "model": llm_model,
+                    "batched": batched, "characters": len(model_response),
+                    "input_tokens": round_tokens_counts['total_input_tokens'],
+                    "output_tokens": round_tokens_counts['total_output_tokens'],
+                    "cost": round_tokens_counts['total_cost']})
+
+
+def create_queue_loggers(name, log_file, transcript_file):
+    # (logger, transcript_logger, listener): both loggers only enqueue, the listener thread writes the files
+    log_queue = queue.SimpleQueue()
+    file_handler = logging.FileHandler(log_file, delay=True)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    file_handler.addFilter(logging.Filter(f"{name}.log"))
+    transcript_handler = logging.FileHandler(transcript_file, delay=True)
+    transcript_handler.setFormatter(logging.Formatter('%(message)s'))
+    transcript_handler.addFilter(logging.Filter(f"{name}.transcript"))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, transcript_handler)
+
+    loggers = []
+    for suffix in ["log", "transcript"]:
+        logger = logging.getLogger(f"{name}.{suffix}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        loggers.append(logger)
+    return loggers[0], loggers[1], listener
+
+
 def generate_code(llm_model, task_name, prompt, client, temperature, bedrock_runtime, inference_profile_arn,
-                  output_folder, tokens_counts, max_retries=5):
+                  output_folder, tokens_counts, max_retries=5, pool=None, watchdog=None, llm_cache=None,
+                  save_values=None, compact_context=False, task_tokens_counts=None, stream=False,
+                  first_response=None, log=logging, transcript=None):
+    # One task at a time through the same attempt / repair loop as generate_code_async (without rate limiting),
+    # returns the last script path
+    script_path, counts = asyncio.run(generate_code_async(
+        llm_model, task_name, prompt, client, temperature, bedrock_runtime, inference_profile_arn, output_folder,
+        tokens_counts, max_retries=max_retries, pool=pool, watchdog=watchdog, llm_cache=llm_cache,
+        save_values=save_values, compact_context=compact_context, stream=stream, first_response=first_response,
+        logger=None if log is logging else log, transcript=transcript))
+    if task_tokens_counts is not None:
+        add_token_counts(task_tokens_counts, counts)
+    return script_path
+
+
+def new_token_counts(attempts=0):
+    # attempts counts the LLM requests, so the tokens of the repaired tasks (attempts > 1) can be told apart
+    return {"total_input_tokens": 0, "total_output_tokens": 0, "total_cost": 0, "attempts": attempts}
+
+
+def add_token_counts(tokens_counts, other):
+    for key in tokens_counts:
+        tokens_counts[key] += other[key]
+
+
+def estimate_tokens(conversation_history):
+    # Rough token count of a request (about 4 characters per token), reserved from the rate limit before sending it
+    text = conversation_history if isinstance(conversation_history, str) else json.dumps(conversation_history)
+    return len(text) // 4
+
+
+def get_provider(llm_model):
+    if llm_model in ["gpt-4o", "o3-mini"]:
+        return "openai"
+    elif llm_model in ["sonnet-35", "haiku"]:
+        return "bedrock"
+    elif llm_model == "gemini":
+        return "gemini"
+    else:
+        raise ValueError(f"Unsupported model type: {llm_model}")
+
+
+# Default request / token budgets per minute of each provider, adjust them to the quotas of the account used
+PROVIDER_RATE_LIMITS = {
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+    "bedrock": {"requests_per_minute": 50, "tokens_per_minute": 200000},
+    "gemini": {"requests_per_minute": 15, "tokens_per_minute": 1000000},
+}
+
+
+class AsyncRateLimiter:
+    # Token bucket for the requests and tokens per minute of one provider (None means no limit); record() corrects
+    # the budget with the actual usage
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_budget = requests_per_minute or 0
+        self.token_budget = tokens_per_minute or 0
+        self.updated = time.monotonic()
+        # Created on first use, inside the running event loop
+        self._lock = None
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        if self.requests_per_minute:
+            self.request_budget = min(self.requests_per_minute,
+                                      self.request_budget + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self.token_budget = min(self.tokens_per_minute, self.token_budget + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens=0):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                self._refill()
+                waits = []
+                if self.requests_per_minute and self.request_budget < 1:
+                    waits.append((1 - self.request_budget) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute:
+                    # A request larger than the whole budget only waits for a full bucket
+                    needed = min(tokens, self.tokens_per_minute)
+                    if self.token_budget < needed:
+                        waits.append((needed - self.token_budget) * 60 / self.tokens_per_minute)
+                if not waits:
+                    break
+                await asyncio.sleep(max(waits))
+            if self.requests_per_minute:
+                self.request_budget -= 1
+            if self.tokens_per_minute:
+                self.token_budget -= tokens
+
+    def record(self, estimated_tokens, actual_tokens):
+        if self.tokens_per_minute:
+            self._refill()
+            self.token_budget -= actual_tokens - estimated_tokens
+
+
+class TaskLogAdapter(logging.LoggerAdapter):
+    # Prefix the messages with the task name, so the concurrent conversations stay readable in the shared log
+    def process(self, msg, kwargs):
+        return f"[{self.extra['task']}] {msg}", kwargs
+
+
+async def generate_code_async(llm_model, task_name, prompt, client, temperature, bedrock_runtime,
+                              inference_profile_arn, output_folder, tokens_counts, max_retries=5, pool=None,
+                              watchdog=None, rate_limiter=None, llm_cache=None, save_values=None,
+                              compact_context=False, stream=False, first_response=None, logger=None,
+                              transcript=None):
+    # Attempt / repair loop of one task: the API call and the script execution run in threads, returns the last
+    # script path and the token counts of the task
+    log = TaskLogAdapter(logger or logging.getLogger(), {"task": task_name})
+    task_tokens_counts = new_token_counts()
     retries = 0
     original_prompt = prompt  # Keep the original prompt unchanged
-    # Initialize an empty list to store the conversation history
+    # Each task keeps its own conversation history
     conversation_history = build_conversation(original_prompt, llm_model)
+    script_path = None
 
     while retries < max_retries:
         print(f"🔹 Generating code for: {task_name} (Attempt {retries + 1}/{max_retries})")
-        logging.info(f"🔹 Generating code for: {task_name} (Attempt {retries + 1}/{max_retries})")
+        log.info(f"🔹 Generating code for: {task_name} (Attempt {retries + 1}/{max_retries})")
         try:
-            response = call_llm_api(llm_model, client, conversation_history, temperature, bedrock_runtime,
-                                    inference_profile_arn)
-            # log the input message
-            logging.info(
-                "---------------------------------INPUT TO LLM FIRST-----------------------------------------")
-            logging.info(conversation_history)
-            # log the LLM response
-            logging.info(
-                "------------------------------------LLM RESPONSE--------------------------------------------")
-            logging.info(response)
+            if transcript is not None:
+                transcript.record_turns(task_name, retries + 1, conversation_history)
+            estimated_tokens = estimate_tokens(conversation_history)
+            batched = retries == 0 and first_response is not None
+            if batched:
+                # The first turn was already answered by a batch job, outside of the interactive rate limits
+                response = first_response
+            else:
+                if rate_limiter is not None:
+                    await rate_limiter.acquire(estimated_tokens)
+                response = await asyncio.to_thread(call_llm_api, llm_model, client, conversation_history,
+                                                   temperature, bedrock_runtime, inference_profile_arn, llm_cache,
+                                                   stream, log)
 
             # Extract model response
             model_response = extract_model_response(llm_model, response)
@@ -407,33 +1144,83 @@ def generate_code(llm_model, task_name, prompt, client, temperature, bedrock_run
                 conversation_history += model_response
             else:
                 conversation_history.append({"role": "assistant", "content": model_response})
-            logging.info(
-                "---------------------------------INPUT TO LLM UPDATE----------------------------------------")
-            logging.info(conversation_history)
 
-            # tracking the token usage will return input and output tokens each round
-            update_token_usage(llm_model, response, tokens_counts)
+            # Token usage of this round, added to the task and to the total (updated from the event loop only)
+            round_tokens_counts = new_token_counts(attempts=1)
+            update_token_usage(llm_model, response, round_tokens_counts, log)
+            if batched:
+                round_tokens_counts['total_cost'] *= BATCH_PRICE_FACTOR
+            add_token_counts(task_tokens_counts, round_tokens_counts)
+            add_token_counts(tokens_counts, round_tokens_counts)
+            if rate_limiter is not None and not batched:
+                rate_limiter.record(estimated_tokens, round_tokens_counts['total_input_tokens'] +
+                                    round_tokens_counts['total_output_tokens'])
+            if transcript is not None:
+                transcript.record_turns(task_name, retries + 1, conversation_history)
+                transcript.record_response(task_name, retries + 1, llm_model, model_response, round_tokens_counts,
+                                           batched)
 
             # Extract Python code using regex, save the full model response and extracted python code
             script_path = save_model_outputs(task_name, output_folder, model_response)
 
             # Execute and check for errors
-            if execute_check_errors(llm_model, script_path, task_name, conversation_history):
-                return  # Exit function if no errors
+            feedback = await asyncio.to_thread(execute_check_errors, llm_model, script_path, task_name,
+                                               conversation_history, pool, watchdog, log, save_values,
+                                               FEEDBACK_MAX_LINES if compact_context else None)
+            if feedback is None:
+                break
+            if llm_model == "gemini":
+                conversation_history += feedback
+            if compact_context:
+                conversation_history = compact_conversation(llm_model, original_prompt, conversation_history,
+                                                            model_response, feedback)
             retries += 1
 
         except Exception as e:
             print(f"❌ API Call Error for {task_name}: {str(e)}")
-            logging.info(f"❌ API Call Error for {task_name}: {str(e)}")
-            return  # Stop retrying if API call fails
+            log.info(f"❌ API Call Error for {task_name}: {str(e)}")
+            break  # Stop retrying if API call fails
+    else:
+        print(f"⚠️ Max retries reached for {task_name}. Check logs for remaining errors.")
+        log.info(f"⚠️ Max retries reached for {task_name}. Check logs for remaining errors.")
+
+    if transcript is not None:
+        # The feedback of the last failed attempt was never sent
+        transcript.record_turns(task_name, retries, conversation_history)
+    log.info(f"Task Attempts: {task_tokens_counts['attempts']}, "
+             f"Task Input Tokens: {task_tokens_counts['total_input_tokens']}, "
+             f"Task Output Tokens: {task_tokens_counts['total_output_tokens']}, "
+             f"Task Estimated Cost: ${task_tokens_counts['total_cost']:.6f}")
+    return script_path, task_tokens_counts
 
-    print(f"⚠️ Max retries reached for {task_name}. Check logs for remaining errors.")
-    logging.info(f"⚠️ Max retries reached for {task_name}. Check logs for remaining errors.")
+
+def create_aws_client(service_name):
+    # AWS client (bedrock-runtime, bedrock, s3), pointed at a local MockLLMServer when MOCK_LLM_URL is set
+    mock_url = os.getenv("MOCK_LLM_URL")
+    if mock_url:
+        config = BotocoreConfig(s3={"addressing_style": "path"}, request_checksum_calculation="when_required",
+                                response_checksum_validation="when_required")
+        return boto3.client(service_name, region_name="us-west-2", endpoint_url=mock_url, config=config,
+                            aws_access_key_id="mock", aws_secret_access_key="mock")
+    return boto3.client(service_name, region_name="us-west-2")
+
+
+def create_bedrock_runtime():
+    return create_aws_client("bedrock-runtime")
 
 
 def api_key_configuration(llm_model):
+    # === Local mock server (mock_llm_server.py) for offline load tests ===
+    mock_url = os.getenv("MOCK_LLM_URL")
+    if mock_url and llm_model in ["gpt-4o", "o3-mini"]:
+        api_key = "mock"
+        client = OpenAI(api_key=api_key, base_url=f"{mock_url}/v1")
+    elif mock_url and llm_model == "gemini":
+        from google import genai
+        api_key = "mock"
+        client = genai.Client(api_key=api_key, http_options={"base_url": mock_url})
     # === OpenAI API Configuration ===
-    if llm_model in ["gpt-4o", "o3-mini"]:
+    elif llm_model in ["gpt-4o", "o3-mini"]:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("Missing OPENAI_API_KEY environment variable.")
@@ -442,6 +1229,7 @@ def api_key_configuration(llm_model):
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
             raise ValueError("Missing GOOGLE_API_KEY environment variable.")
+        from google import genai
         client = genai.Client(api_key=api_key)
     elif llm_model in ["sonnet-35", "haiku"]:
         api_key, client = None, None
@@ -463,18 +1251,21 @@ def api_key_configuration(llm_model):
 
 
 class LLMCodeGenerator:
-    def __init__(self, llm_model, prompt_json, temperature=0.0, reviewer=True):
+    def __init__(self, llm_model, prompt_json, temperature=0.0, reviewer=True, warm_pool=False, watchdog=None,
+                 max_concurrency=8, rate_limits=None, progress=None, response_cache=None, compact_context=False,
+                 stream=False, batch_s3_uri=None, batch_role_arn=None, batch_poll_interval=BATCH_POLL_INTERVAL):
         self.llm_model = llm_model
         self.prompt_json = prompt_json
         self.temperature = temperature
         # Initialize AWS Bedrock client
-        self.bedrock_runtime = boto3.client("bedrock-runtime", region_name="us-west-2")
+        self.bedrock_runtime = create_bedrock_runtime()
         # Get current time with microseconds
         self.timestamp = datetime.now().strftime("%H-%M-%S-%f")  # %f gives microseconds
         # === Paths ===
         # PDE_Benchmark root
         self.ROOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PDE_Benchmark')
         self.PROMPTS_FILE = os.path.join(self.ROOT_DIR, "prompt", prompt_json)
+        self.QUESTIONS_FILE = os.path.join(self.ROOT_DIR, "prompt", "PDE_TASK_QUESTION_ONLY.json")
         self.OUTPUT_FOLDER = os.path.join(self.ROOT_DIR, f"solver/{llm_model}/{os.path.splitext(prompt_json)[0]}")
         self.REPORT_FOLDER = os.path.join(self.ROOT_DIR, 'report')
         self.LOG_FILE = os.path.join(self.REPORT_FOLDER, f"{llm_model}_{os.path.splitext(prompt_json)[0]}_"
@@ -484,51 +1275,228 @@ class LLMCodeGenerator:
         os.makedirs(self.REPORT_FOLDER, exist_ok=True)
 
         # Tracking the total input and output tokens
-        self.tokens_counts = {"total_input_tokens": 0, "total_output_tokens": 0, "total_cost": 0}
+        self.tokens_counts = new_token_counts()
+        # and the tokens of each task (filled by call_api_async)
+        self.task_tokens_counts = {}
         if reviewer:
             self.max_retries = 5
         else:
             self.max_retries = 1
-
-        logging.basicConfig(
-            filename=self.LOG_FILE,
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
-        )
+        # Send only the prompt, the latest code and its trimmed feedback on each retry (see compact_conversation)
+        self.compact_context = compact_context
+        # Stream the completions and stop reading them after the first code block (see stream_llm_api)
+        self.stream = stream
+        # Batch jobs of call_api_batch: Bedrock reads / writes the records in batch_s3_uri with the batch_role_arn role
+        self.batch_s3_uri = batch_s3_uri or os.getenv("BEDROCK_BATCH_S3_URI")
+        self.batch_role_arn = batch_role_arn or os.getenv("BEDROCK_BATCH_ROLE_ARN")
+        self.batch_poll_interval = batch_poll_interval
+        # Run the generated code in forked warm interpreters instead of a fresh python3 for every attempt
+        self.worker_pool = WarmWorkerPool() if warm_pool else None
+        # Optional DivergenceWatchdog to stop blowing-up attempts early
+        self.watchdog = watchdog
+        # Number of task conversations run at once by call_api_async, and the provider request / token budgets
+        self.max_concurrency = max_concurrency
+        self.rate_limits = rate_limits if rate_limits is not None else PROVIDER_RATE_LIMITS[get_provider(llm_model)]
+        # Optional callback progress(task_name, done, total) called as the tasks of call_api_async finish
+        self.progress = progress
+        # LLM response cache: None, "read_write" or "replay" (offline, only cached responses)
+        self.LLM_CACHE_FOLDER = os.path.join(self.ROOT_DIR, 'cache/llm')
+        self.llm_cache = LLMResponseCache(self.LLM_CACHE_FOLDER, response_cache) if response_cache else None
+
+        # Own run log and JSONL transcript next to it, written by a queue listener thread (see create_queue_loggers)
+        self.TRANSCRIPT_FILE = get_records_file(self.LOG_FILE)
+        self.logger, transcript_logger, self.log_listener = create_queue_loggers(
+            f"cfdllmbench.generator.{llm_model}.{os.path.splitext(prompt_json)[0]}.{self.timestamp}",
+            self.LOG_FILE, self.TRANSCRIPT_FILE)
+        self.transcript = TranscriptLog(transcript_logger)
+        self._logging_depth = 0
+
+    @contextlib.contextmanager
+    def logging_run(self):
+        # The queue listener runs for the duration of a run (nested runs share it), stopping it flushes the queue
+        if self._logging_depth == 0:
+            self.log_listener.start()
+        self._logging_depth += 1
+        try:
+            yield self.logger
+        finally:
+            self._logging_depth -= 1
+            if self._logging_depth == 0:
+                self.log_listener.stop()
 
     def call_api(self):
-        logging.info(
-            "####################################################################################################")
-        logging.info(f"Using the {self.llm_model}, change temperature to {self.temperature}, "
-                     f"use the prompt {self.prompt_json}")
-        # === Get API credentials, client, and profile ===
-        api_key, client, inference_profile_arn = api_key_configuration(self.llm_model)
-        # Load prompts
-        with open(self.PROMPTS_FILE, "r") as file:
-            pde_prompts = json.load(file)
+        with self.logging_run():
+            self.logger.info(
+                "####################################################################################################")
+            self.logger.info(f"Using the {self.llm_model}, change temperature to {self.temperature}, "
+                             f"use the prompt {self.prompt_json}")
+            # === Get API credentials, client, and profile ===
+            api_key, client, inference_profile_arn = self.get_api_configuration()
+            # Load prompts
+            with open(self.PROMPTS_FILE, "r") as file:
+                pde_prompts = json.load(file)
+
+            save_values = self.load_save_values()
+
+            # Loop through prompts and generate code
+            for task_name, prompt in pde_prompts["prompts"].items():
+                # if task_name not in ["Fully_Developed_Turbulent_Channel_Flow"]:
+                #     continue
+                generate_code(
+                    self.llm_model,
+                    task_name,
+                    prompt,
+                    client,
+                    self.temperature,
+                    self.bedrock_runtime,
+                    inference_profile_arn,
+                    self.OUTPUT_FOLDER,
+                    self.tokens_counts,
+                    max_retries=self.max_retries,
+                    pool=self.worker_pool,
+                    watchdog=self.watchdog,
+                    llm_cache=self.llm_cache,
+                    save_values=save_values.get(task_name),
+                    compact_context=self.compact_context,
+                    stream=self.stream,
+                    task_tokens_counts=self.task_tokens_counts.setdefault(task_name, new_token_counts()),
+                    log=self.logger,
+                    transcript=self.transcript
+                )
+
+            self.log_token_totals()
+
+    async def call_api_async(self, first_responses=None):
+        with self.logging_run():
+            self.logger.info(
+                "####################################################################################################")
+            self.logger.info(f"Using the {self.llm_model}, change temperature to {self.temperature}, "
+                             f"use the prompt {self.prompt_json}, up to {self.max_concurrency} tasks at once")
+            # === Get API credentials, client, and profile ===
+            api_key, client, inference_profile_arn = self.get_api_configuration()
+            # Load prompts
+            with open(self.PROMPTS_FILE, "r") as file:
+                pde_prompts = json.load(file)
+
+            save_values = self.load_save_values()
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            rate_limiter = AsyncRateLimiter(**self.rate_limits)
+            total = len(pde_prompts["prompts"])
+
+            async def run_task(task_name, prompt):
+                async with semaphore:
+                    _, self.task_tokens_counts[task_name] = await generate_code_async(
+                        self.llm_model,
+                        task_name,
+                        prompt,
+                        client,
+                        self.temperature,
+                        self.bedrock_runtime,
+                        inference_profile_arn,
+                        self.OUTPUT_FOLDER,
+                        self.tokens_counts,
+                        max_retries=self.max_retries,
+                        pool=self.worker_pool,
+                        watchdog=self.watchdog,
+                        rate_limiter=rate_limiter,
+                        llm_cache=self.llm_cache,
+                        save_values=save_values.get(task_name),
+                        compact_context=self.compact_context,
+                        stream=self.stream,
+                        first_response=(first_responses or {}).get(task_name),
+                        logger=self.logger,
+                        transcript=self.transcript
+                    )
+                    if self.progress is not None:
+                        self.progress(task_name, len(self.task_tokens_counts), total)
+
+            # Run the task conversations concurrently, at most max_concurrency at a time
+            await asyncio.gather(*(run_task(task_name, prompt)
+                                   for task_name, prompt in pde_prompts["prompts"].items()))
+            self.log_token_totals()
+
+    def load_save_values(self):
+        # save_values of each task, checked by the pre-flight stage of the repair loop ({} without the questions)
+        if not os.path.exists(self.QUESTIONS_FILE):
+            return {}
+        with open(self.QUESTIONS_FILE, "r") as file:
+            problems = json.load(file)
+        return {task_name: data.get("save_values", []) for task_name, data in problems.items()}
+
+    def get_api_configuration(self):
+        # In replay mode every response comes from the cache, so no API key or client is needed
+        if self.llm_cache is not None and self.llm_cache.mode == "replay":
+            return None, None, None
+        return api_key_configuration(self.llm_model)
+
+    def call_api_concurrent(self):
+        asyncio.run(self.call_api_async())
+
+    def call_api_batch(self):
+        # First turns of all the tasks as one batch job, then the repair rounds interactively and concurrently
+        with self.logging_run():
+            api_key, client, inference_profile_arn = self.get_api_configuration()
+            with open(self.PROMPTS_FILE, "r") as file:
+                pde_prompts = json.load(file)
+            first_responses = self.submit_batch(client, inference_profile_arn, pde_prompts["prompts"])
+            asyncio.run(self.call_api_async(first_responses))
+
+    def submit_batch(self, client, inference_profile_arn, prompts):
+        # {task_name: response} of the first turns answered by a batch job, the others are asked interactively
+        conversations = {task_name: build_conversation(prompt, self.llm_model) for task_name, prompt in prompts.items()}
+        keys = {}
+        if self.llm_cache is not None:
+            if self.llm_cache.mode == "replay":
+                return {}
+            # The first turns the interactive requests would find in the response cache are not submitted again,
+            # the batch responses are stored as full (not streamed) responses
+            for task_name, conversation_history in list(conversations.items()):
+                keys[task_name] = self.llm_cache.make_key(self.llm_model, self.temperature, conversation_history)
+                lookup_key = self.llm_cache.make_key(self.llm_model, self.temperature, conversation_history,
+                                                     self.stream)
+                if self.llm_cache.load(self.llm_model, lookup_key) is not None:
+                    del conversations[task_name]
+        if not conversations:
+            return {}
+
+        provider = get_provider(self.llm_model)
+        if provider == "openai":
+            responses = run_openai_batch(client, self.llm_model, conversations, self.temperature,
+                                         self.batch_poll_interval, self.logger)
+        elif provider == "bedrock" and self.batch_s3_uri and self.batch_role_arn:
+            responses = run_bedrock_batch(inference_profile_arn, conversations, self.temperature, self.batch_s3_uri,
+                                          self.batch_role_arn, self.batch_poll_interval, self.logger)
+        else:
+            self.logger.info(f"No batch mode for {self.llm_model} (Bedrock needs batch_s3_uri and "
+                             f"batch_role_arn), the first turns are sent interactively")
+            return {}
 
-        # Loop through prompts and generate code
-        for task_name, prompt in pde_prompts["prompts"].items():
-            # if task_name not in ["Fully_Developed_Turbulent_Channel_Flow"]:
-            #     continue
-            generate_code(
-                self.llm_model,
-                task_name,
-                prompt,
-                client,
-                self.temperature,
-                self.bedrock_runtime,
-                inference_profile_arn,
-                self.OUTPUT_FOLDER,
-                self.tokens_counts,
-                max_retries=self.max_retries
-            )
+        if self.llm_cache is not None:
+            for task_name, response in responses.items():
+                responses[task_name] = self.llm_cache.store(self.llm_model, keys[task_name], self.temperature,
+                                                            conversations[task_name], response)
+        return responses
 
+    def log_token_totals(self):
         print("\n🎯 Execution completed. Check the solver directory for generated files.")
-        logging.info("\n🎯 Execution completed. Check the solver directory for generated files.")
-        logging.info(f"Total Input Tokens: {self.tokens_counts['total_input_tokens']}")
-        logging.info(f"Total Output Tokens: {self.tokens_counts['total_output_tokens']}")
-        logging.info(f"Total Estimated Cost: ${self.tokens_counts['total_cost']:.6f}")
+        self.logger.info("\n🎯 Execution completed. Check the solver directory for generated files.")
+        for task_name, task_tokens_counts in sorted(self.task_tokens_counts.items()):
+            self.logger.info(f"{task_name}: Attempts: {task_tokens_counts['attempts']}, "
+                             f"Input Tokens: {task_tokens_counts['total_input_tokens']}, "
+                             f"Output Tokens: {task_tokens_counts['total_output_tokens']}, "
+                             f"Estimated Cost: ${task_tokens_counts['total_cost']:.6f}")
+        # Tokens spent on the tasks that needed the repair loop, per request, to measure the context compaction
+        repaired = [counts for counts in self.task_tokens_counts.values() if counts['attempts'] > 1]
+        if repaired:
+            repaired_attempts = sum(counts['attempts'] for counts in repaired)
+            repaired_input_tokens = sum(counts['total_input_tokens'] for counts in repaired)
+            self.logger.info(f"Repaired Tasks: {len(repaired)} ({repaired_attempts} requests, compact context: "
+                             f"{self.compact_context}), Input Tokens: {repaired_input_tokens} "
+                             f"({repaired_input_tokens / repaired_attempts:.0f} per request)")
+        self.logger.info(f"Total Input Tokens: {self.tokens_counts['total_input_tokens']}")
+        self.logger.info(f"Total Output Tokens: {self.tokens_counts['total_output_tokens']}")
+        self.logger.info(f"Total Estimated Cost: ${self.tokens_counts['total_cost']:.6f}")
 
 
 def replacer_factory(base_name, save_dir):
@@ -541,16 +1509,19 @@ def replacer_factory(base_name, save_dir):
     return replacer
 
 
-def call_post_process(generated_solvers_dir, save_dir):
+def call_post_process(generated_solvers_dir, save_dir, python_files=None):
     # === Paths ===
     folder_path = generated_solvers_dir
     os.makedirs(save_dir, exist_ok=True)
+    # Only rewrite the given solver scripts (all of them by default)
+    if python_files is None:
+        python_files = os.listdir(folder_path)
 
     # pattern = r"np\.save\((['\"])(.+?\.npy)\1\s*,\s*(\w+)\s*\)"
     # Match np.save("something", variable) — with or without .npy
     pattern = r"np\.save\((['\"])(.+?)\1\s*,\s*(\w+)\s*\)"
 
-    for filename in os.listdir(folder_path):
+    for filename in python_files:
         if filename.endswith(".py"):
             py_path = os.path.join(folder_path, filename)
             base_name = os.path.splitext(filename)[0]  # e.g., "burgers_solver"
@@ -572,35 +1543,50 @@ def call_post_process(generated_solvers_dir, save_dir):
                 print(f"ℹ️ No np.save calls updated in {filename}")
 
 
+def is_clean_execution(result):
+    # Normalize case for easier checking
+    stdout_lower = result.stdout.lower()
+    stderr_lower = result.stderr.lower()
+
+    # Define pass condition: no "error" or "warning" in either output
+    has_error_or_warning = (
+        "error" in stdout_lower or
+        "error" in stderr_lower or
+        "warning" in stdout_lower or
+        "warning" in stderr_lower
+    )
+    return result.returncode == 0 and not has_error_or_warning
+
+
 def write_execute_results_to_log(log, script, result, status_counts):
     try:
         # Write execution results to log file
         log.write(f"--- Running: {script} ---\n")
         log.write(f"Exit Code: {result.returncode}\n")
+        if getattr(result, "status", None) == "diverged":
+            log.write(f"Status: diverged ({result.status_reason})\n")
+        resources = getattr(result, "resources", None)
+        if resources:
+            log.write(f"Resources: wall={resources['wall_time']:.2f}s, user={resources['user_time']:.2f}s, "
+                      f"sys={resources['system_time']:.2f}s, peak RSS={resources['peak_rss_mb']:.1f}MB, "
+                      f"child processes={resources['child_processes']}\n")
+        for stream, dropped in getattr(result, "dropped_output", {}).items():
+            log.write(f"Truncated {stream}: {dropped['lines']} lines ({dropped['bytes']} bytes) dropped\n")
         log.write("Output:\n")
         log.write(result.stdout + "\n")
         log.write("Errors:\n")
         log.write(result.stderr + "\n")
         log.write("-" * 50 + "\n\n")
 
-        # Normalize case for easier checking
-        stdout_lower = result.stdout.lower()
-        stderr_lower = result.stderr.lower()
-
-        # Define pass condition: no "error" or "warning" in either output
-        has_error_or_warning = (
-            "error" in stdout_lower or
-            "error" in stderr_lower or
-            "warning" in stdout_lower or
-            "warning" in stderr_lower
-        )
-
-        if result.returncode == 0 and not has_error_or_warning:
+        if is_clean_execution(result):
             print(f"✅ {script} executed successfully with clean output.")
             status_counts['pass'] += 1
         else:
             print(f"❌ {script} has warnings or errors (check logs).")
             status_counts['fail'] += 1
+            # Diverged solvers are failures, also counted separately
+            if getattr(result, "status", None) == "diverged" and 'diverged' in status_counts:
+                status_counts['diverged'] += 1
 
     except Exception as e:
         log.write(f"Exception occurred while logging execution: {e}\n")
@@ -625,38 +1611,370 @@ def write_execute_summary_to_log(log, status_counts):
         log.write("\n\n====== Execution Summary ======\n")
         log.write(f"Total Scripts Passed: {status_counts['pass']}\n")
         log.write(f"Total Scripts Failed: {status_counts['fail']}\n")
+        if 'diverged' in status_counts:
+            log.write(f"Total Scripts Diverged: {status_counts['diverged']}\n")
     except Exception as e:
         log.write(f" {e}\n")
 
 
-def open_log_save_execution_results(log_file, python_files, generate_solvers_dir, status_counts):
+def get_records_file(log_file):
+    # The machine-readable JSONL records are written next to the human-readable log
+    return os.path.splitext(log_file)[0] + ".jsonl"
+
+
+def write_jsonl_records(records_file, records):
+    os.makedirs(os.path.dirname(records_file), exist_ok=True)
+    with open(records_file, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def build_execution_record(script, result):
+    # One flat record per solver run, so the records load straight into a table
+    record = {"script": script, "task": os.path.splitext(script)[0]}
+    if isinstance(result, subprocess.TimeoutExpired):
+        record.update({"status": "timeout", "passed": False, "returncode": None})
+        return record
+    if result is None:
+        record.update({"status": "error", "passed": False, "returncode": None})
+        return record
+
+    record.update({
+        "status": getattr(result, "status", None),
+        "status_reason": getattr(result, "status_reason", None),
+        "passed": is_clean_execution(result),
+        "returncode": result.returncode,
+        "cached": getattr(result, "cached", False),
+    })
+    # wall_time, user_time, system_time, peak_rss_mb, child_processes
+    record.update(getattr(result, "resources", None) or {})
+    for stream, dropped in getattr(result, "dropped_output", {}).items():
+        record[f"{stream}_dropped_lines"] = dropped["lines"]
+        record[f"{stream}_dropped_bytes"] = dropped["bytes"]
+    return record
+
+
+class ExecutionCache:
+    # Content-addressed cache of solver runs: key = solver source + Python/NumPy/SciPy versions + run settings,
+    # each entry keeps the SolverResult fields and the .npy outputs to restore on a hit
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # The solvers run with the interpreter of the benchmark (solver_worker.SOLVER_PYTHON), so its versions are the
+        # ones the solvers import
+        self.environment = (f"python={SOLVER_PYTHON};{sys.version};numpy={np.__version__};"
+                            f"scipy={scipy.__version__}")
+
+    def make_key(self, script_path, timeout, watchdog=None, capture_outputs=False, save_dir=None):
+        with open(script_path, "rb") as f:
+            source = f.read()
+        digest = hashlib.sha256()
+        digest.update(source)
+        digest.update(self.environment.encode("utf-8"))
+        digest.update(f"timeout={timeout}".encode("utf-8"))
+        # A watchdog can stop a run early, so its settings are part of the key
+        if watchdog is not None:
+            digest.update(repr(watchdog).encode("utf-8"))
+        # Intercepted saves land in <save_dir>/<var>_<task>.npy whatever paths the source uses, so the destination
+        # and the task (the script name) are part of the key
+        if capture_outputs:
+            digest.update(b"capture_outputs")
+            digest.update(f"task={os.path.basename(script_path)};save_dir={os.path.abspath(save_dir or '')}"
+                          .encode("utf-8"))
+        return digest.hexdigest()
+
+    def load(self, key, save_dir):
+        entry_dir = os.path.join(self.cache_dir, key)
+        result_file = os.path.join(entry_dir, "result.json")
+        if not os.path.exists(result_file):
+            return None
+        with open(result_file, "r") as f:
+            entry = json.load(f)
+
+        # Restore the produced .npy outputs
+        if entry["outputs"]:
+            os.makedirs(save_dir, exist_ok=True)
+        for output in entry["outputs"]:
+            shutil.copy2(os.path.join(entry_dir, output), os.path.join(save_dir, output))
+
+        return SolverResult(entry["args"], entry["returncode"], entry["stdout"], entry["stderr"],
+                            entry.get("resources"), dropped_output=entry.get("dropped_output"),
+                            status=entry.get("status"), status_reason=entry.get("status_reason"))
+
+    def store(self, key, script_path, result, save_dir, start_time):
+        # The outputs of a solver are the <var>_<task>.npy files written to the prediction folder during its run
+        task_name = os.path.splitext(os.path.basename(script_path))[0]
+        outputs = []
+        if save_dir and os.path.isdir(save_dir):
+            outputs = sorted(f for f in os.listdir(save_dir)
+                             if f.endswith(f"_{task_name}.npy")
+                             and os.path.getmtime(os.path.join(save_dir, f)) >= start_time)
+
+        # Write into a temporary folder first so a half-written entry is never seen as a hit
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=f".{key}-")
+        try:
+            for output in outputs:
+                shutil.copy2(os.path.join(save_dir, output), os.path.join(tmp_dir, output))
+            with open(os.path.join(tmp_dir, "result.json"), "w") as f:
+                json.dump({
+                    "script": script_path,
+                    "args": result.args,
+                    "returncode": result.returncode,
+                    "stdout": result.stdout,
+                    "stderr": result.stderr,
+                    "resources": getattr(result, "resources", {}),
+                    "dropped_output": getattr(result, "dropped_output", {}),
+                    "status": getattr(result, "status", None),
+                    "status_reason": getattr(result, "status_reason", None),
+                    "outputs": outputs,
+                    "environment": self.environment,
+                }, f, indent=2)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except Exception as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            logging.warning(f"Failed to cache execution result of {script_path}: {e}")
+
+
+def execute_python_script_cached(filepath, cache=None, save_dir=None, timeout=60, pool=None, watchdog=None,
+                                 capture_outputs=False):
+    # With capture_outputs, the saves of the script are intercepted and written to save_dir
+    output_dir = save_dir if capture_outputs else None
+    if cache is None:
+        return execute_python_script(filepath, timeout=timeout, pool=pool, watchdog=watchdog, output_dir=output_dir)
+
+    key = cache.make_key(filepath, timeout, watchdog, capture_outputs, save_dir)
+    result = cache.load(key, save_dir)
+    if result is not None:
+        print(f"♻️ Cache hit: {os.path.basename(filepath)}")
+        result.cached = True
+        logging.info(f"Cache hit for {filepath} ({key})")
+        return "Restored from execution cache.", result
+
+    start_time = time.time()
+    feedback, result = execute_python_script(filepath, timeout=timeout, pool=pool, watchdog=watchdog,
+                                             output_dir=output_dir)
+    # Unexpected errors and timeouts have no result to restore, so they are always re-run
+    if isinstance(result, SolverResult):
+        cache.store(key, filepath, result, save_dir, start_time)
+    return feedback, result
+
+
+# Names the solvers use for the grid size, the number of time steps and the simulated time
+GRID_SIZE_NAMES = {"nx", "ny", "nz"}
+TIME_STEP_NAMES = {"nt", "n_steps", "nsteps", "num_steps"}
+FINAL_TIME_NAMES = ["t_final", "T_final", "t_end", "t_max", "tf", "T"]
+# Python-level loops over the grid points are far slower than vectorized NumPy updates
+PYTHON_LOOP_COST_FACTOR = 50
+
+
+def evaluate_constant(node, values):
+    # Evaluate simple numeric expressions such as `41`, `2 * nx` or `int(t_final / dt)` (None if not constant)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.Name):
+        return values.get(node.id)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        operand = evaluate_constant(node.operand, values)
+        return -operand if operand is not None else None
+    if isinstance(node, ast.BinOp):
+        left, right = evaluate_constant(node.left, values), evaluate_constant(node.right, values)
+        if left is None or right is None:
+            return None
+        try:
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            if isinstance(node.op, ast.Div):
+                return left / right
+            if isinstance(node.op, ast.FloorDiv):
+                return left // right
+            if isinstance(node.op, ast.Pow) and abs(right) <= 64:
+                return left ** right
+        except (ZeroDivisionError, OverflowError):
+            return None
+        return None
+    if isinstance(node, ast.Call) and len(node.args) == 1:
+        # int(...), round(...), math.ceil(...), np.ceil(...), ...
+        func = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", None)
+        if func in ("int", "round", "ceil", "floor", "float"):
+            return evaluate_constant(node.args[0], values)
+    return None
+
+
+def get_loop_depth(node, depth=0):
+    # Deepest nesting of for/while loops below the node
+    if isinstance(node, (ast.For, ast.While)):
+        depth += 1
+    return max([depth] + [get_loop_depth(child, depth) for child in ast.iter_child_nodes(node)])
+
+
+def estimate_solver_cost(script_path):
+    # Static cost of a solver in arbitrary units: grid points * time steps, scaled up for nested Python loops
+    # (None if the script cannot be parsed)
     try:
+        with open(script_path, "r") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    # Numeric names in source order, from assignments and keyword arguments (e.g. solver(nx=41, ny=41)); ast.walk is
+    # breadth-first, so the nodes are sorted by position
+    values = {}
+    nodes = sorted((node for node in ast.walk(tree) if isinstance(node, (ast.Assign, ast.keyword))),
+                   key=lambda node: (node.lineno, node.col_offset))
+    for node in nodes:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name, value_node = node.targets[0].id, node.value
+        elif isinstance(node, ast.keyword) and node.arg:
+            name, value_node = node.arg, node.value
+        else:
+            continue
+        value = evaluate_constant(value_node, values)
+        if value is not None:
+            values[name] = value
+    lower_values = {name.lower(): value for name, value in values.items()}
+
+    grid_points = 1
+    for name in GRID_SIZE_NAMES:
+        grid_points *= max(1, lower_values.get(name, 1))
+    time_steps = next((lower_values[n] for n in TIME_STEP_NAMES if n in lower_values), None)
+    if time_steps is None and values.get("dt"):
+        final_time = next((values[n] for n in FINAL_TIME_NAMES if n in values), None)
+        time_steps = final_time / values["dt"] if final_time else None
+    cost = float(grid_points) * max(1, time_steps or 1)
+
+    # Time loop plus at least one loop over the grid
+    if get_loop_depth(tree) >= 2:
+        cost *= PYTHON_LOOP_COST_FACTOR
+    return cost
+
+
+class RuntimeHistory:
+    # Wall times of previous runs per task, blended with an exponential moving average
+    def __init__(self, history_file, smoothing=0.5):
+        self.history_file = history_file
+        self.smoothing = smoothing
+        self.wall_times = {}
+        if os.path.exists(history_file):
+            try:
+                with open(history_file, "r") as f:
+                    self.wall_times = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable runtime history {history_file}: {e}")
+
+    def get(self, task):
+        return self.wall_times.get(task)
+
+    def update(self, task, wall_time):
+        previous = self.wall_times.get(task)
+        if previous is None:
+            self.wall_times[task] = wall_time
+        else:
+            self.wall_times[task] = self.smoothing * wall_time + (1 - self.smoothing) * previous
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+        tmp_file = f"{self.history_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(self.wall_times, f, indent=2)
+        os.replace(tmp_file, self.history_file)
+
+
+def order_longest_first(python_files, generate_solvers_dir, history=None):
+    # Longest predicted runtime first: the historical wall time, otherwise the static cost converted with the median
+    # seconds per unit of the tasks that have both
+    costs = {script: estimate_solver_cost(os.path.join(generate_solvers_dir, script)) for script in python_files}
+    known_costs = [cost for cost in costs.values() if cost]
+    default_cost = float(np.median(known_costs)) if known_costs else 1.0
+    costs = {script: cost or default_cost for script, cost in costs.items()}
+
+    wall_times = {}
+    if history is not None:
+        for script in python_files:
+            wall_time = history.get(os.path.splitext(script)[0])
+            if wall_time is not None:
+                wall_times[script] = wall_time
+    seconds_per_unit = float(np.median([wall_times[s] / costs[s] for s in wall_times])) if wall_times else 1.0
+
+    predicted = {script: wall_times.get(script, costs[script] * seconds_per_unit) for script in python_files}
+    return sorted(python_files, key=lambda script: predicted[script], reverse=True)
+
+
+def run_solver_scripts(python_files, generate_solvers_dir, max_workers=None, cache=None, save_dir=None, pool=None,
+                       watchdog=None, history=None, capture_outputs=False):
+    # Each solver runs in its own subprocess, so threads are enough to keep several interpreters busy at once
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(python_files)))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        # Longest predicted jobs first, so a heavy solver does not start last and dominate the total time
+        for script in order_longest_first(python_files, generate_solvers_dir, history):
+            script_path = os.path.join(generate_solvers_dir, script)
+            print(f"🔹 Running: {script} ...")
+            futures[executor.submit(execute_python_script_cached, script_path, cache, save_dir, pool=pool,
+                                    watchdog=watchdog, capture_outputs=capture_outputs)] = script
+
+        # Collect the results as they finish
+        for future in as_completed(futures):
+            script = futures[future]
+            try:
+                _, result = future.result()
+                results[script] = result
+            except subprocess.TimeoutExpired as e:
+                results[script] = e
+            print(f"🔸 Finished: {script}")
+
+    # Return the results in the same order as the input scripts
+    return [(script, results[script]) for script in python_files]
+
+
+def open_log_save_execution_results(log_file, python_files, generate_solvers_dir, status_counts, max_workers=None,
+                                    cache=None, save_dir=None, pool=None, watchdog=None, history=None,
+                                    capture_outputs=False):
+    try:
+        records = []
         with open(log_file, "w") as log:
             log.write("====== Execution Results for Generated Solvers ======\n\n")
 
-            for script in python_files:
-                script_path = os.path.join(generate_solvers_dir, script)
-                print(f"🔹 Running: {script} ...")
-
-                # Run the script and capture the output
-                try:
-                    _, result = execute_python_script(script_path)
+            # Run the scripts in parallel and capture the output
+            execution_results = run_solver_scripts(python_files, generate_solvers_dir, max_workers, cache, save_dir,
+                                                   pool, watchdog, history, capture_outputs)
 
+            for script, result in execution_results:
+                if isinstance(result, subprocess.TimeoutExpired):
+                    write_execute_error_to_log(log, script, status_counts)
+                else:
                     # Write execution results to log file
                     write_execute_results_to_log(log, script, result, status_counts)
-
-                except subprocess.TimeoutExpired:
-                    write_execute_error_to_log(log, script, status_counts)
-
-                # Log the summary of pass and fail counts
-                write_execute_summary_to_log(log, status_counts)
-
-        print(f"\n🎯 Execution completed. Results saved in: {log_file}")
+                records.append(build_execution_record(script, result))
+
+            # Log the summary of pass and fail counts once all the scripts are done
+            write_execute_summary_to_log(log, status_counts)
+
+        records_file = get_records_file(log_file)
+        write_jsonl_records(records_file, records)
+        # Remember how long each solver took for the scheduling of the next runs
+        if history is not None:
+            for record in records:
+                if record.get("wall_time") is not None:
+                    history.update(record["task"], record["wall_time"])
+            history.save()
+        print(f"\n🎯 Execution completed. Results saved in: {log_file} and {records_file}")
     except Exception as e:
         log.write(f" {e}\n")
 
 
-def call_execute_solver(generated_solvers_dir, log_file, status_counts):
+def call_execute_solver(generated_solvers_dir, log_file, status_counts, max_workers=None, cache=None, save_dir=None,
+                        pool=None, watchdog=None, python_files=None, history=None, capture_outputs=False):
     try:
         # Define the directory where generated solver scripts are stored
         GENERATED_SOLVERS_DIR = generated_solvers_dir
@@ -666,45 +1984,212 @@ def call_execute_solver(generated_solvers_dir, log_file, status_counts):
         # Ensure the output directory exists
         os.makedirs(GENERATED_SOLVERS_DIR, exist_ok=True)
 
-        # Get all Python files in the solvers directory
-        python_files = [f for f in os.listdir(GENERATED_SOLVERS_DIR) if f.endswith(".py")]
+        # Get all Python files in the solvers directory (unless given), sorted so the log order is deterministic
+        if python_files is None:
+            python_files = os.listdir(GENERATED_SOLVERS_DIR)
+        python_files = sorted(f for f in python_files if f.endswith(".py"))
 
-        # Ensure there are solver scripts to run
+        # Ensure there are solver scripts to run (an empty run is reported to the caller, the process keeps going)
         if not python_files:
             print("No Python solver scripts found in the directory.")
-            exit()
+            return []
         # Initialize counters for pass and fail
         # Open a log file to save execution results
-        open_log_save_execution_results(LOG_FILE, python_files, GENERATED_SOLVERS_DIR, status_counts)
+        open_log_save_execution_results(LOG_FILE, python_files, GENERATED_SOLVERS_DIR, status_counts, max_workers,
+                                        cache, save_dir, pool, watchdog, history, capture_outputs)
+        # The scripts that were run
+        return python_files
     except Exception as e:
         print(f" {e}\n")
+        return []
+
+
+# Grid layouts of the compared arrays, all spanning the same domain along each axis:
+# "node": points on both boundaries (np.linspace(a, b, n)), the alignment the index-space zoom used to assume
+# "cell": cell centres, half a cell away from the boundaries (a + (i + 0.5) * dx)
+# "periodic": points on the left boundary only, the right one wraps around (np.linspace(a, b, n, endpoint=False))
+GRID_TYPES = ("node", "cell", "periodic")
+DEFAULT_GRID_TYPE = "node"
+
+
+def interpolation_matrix(n_source, n_target, grid_type):
+    # (n_target, n_source) sparse linear interpolation weights between two layouts of one axis
+    if grid_type not in GRID_TYPES:
+        raise ValueError(f"Unknown grid type {grid_type!r}, expected one of {GRID_TYPES}")
+    target = np.arange(n_target, dtype=np.float64)
+    if grid_type == "node":
+        # Source index of each target point (the end points coincide)
+        x = target * ((n_source - 1) / (n_target - 1)) if n_target > 1 else np.zeros(1)
+    elif grid_type == "cell":
+        # Outside the first / last cell centre the nearest value is kept
+        x = np.clip((target + 0.5) * (n_source / n_target) - 0.5, 0, n_source - 1)
+    else:
+        x = target * (n_source / n_target)
 
-
-def interpolate_to_match(gt, pred):
+    left = np.floor(x).astype(np.int64)
+    if grid_type == "periodic":
+        left %= n_source
+        right = (left + 1) % n_source
+    else:
+        left = np.minimum(left, max(n_source - 2, 0))
+        right = np.minimum(left + 1, n_source - 1)
+    weight = x - np.floor(x) if grid_type == "periodic" else x - left
+    rows = np.repeat(np.arange(n_target), 2)
+    columns = np.column_stack([left, right]).ravel()
+    data = np.column_stack([1 - weight, weight]).ravel()
+    # coo -> csr sums the two weights of a degenerate (single point) source axis
+    return scipy.sparse.coo_matrix((data, (rows, columns)), shape=(n_target, n_source)).tocsr()
+
+
+@functools.lru_cache(maxsize=32)
+def get_regrid_operator(source_shape, target_shape, grid_type=DEFAULT_GRID_TYPE):
+    # Sparse multilinear interpolation between two grids (Kronecker product of the axes), cached per process
+    if len(source_shape) != len(target_shape):
+        raise ValueError(f"Cannot regrid a {len(source_shape)}D array to a {len(target_shape)}D grid")
+    operator = scipy.sparse.identity(1, format="csr")
+    for n_source, n_target in zip(source_shape, target_shape):
+        axis = (scipy.sparse.identity(n_source, format="csr") if n_source == n_target
+                else interpolation_matrix(n_source, n_target, grid_type))
+        operator = scipy.sparse.kron(operator, axis, format="csr")
+    return operator
+
+
+def regrid(array, target_shape, grid_type=DEFAULT_GRID_TYPE):
+    # One sparse mat-vec with the cached operator of the two grids, in the dtype of the input like ndimage.zoom
+    array = np.asarray(array)
+    operator = get_regrid_operator(tuple(array.shape), tuple(target_shape), grid_type)
+    resized = (operator @ array.reshape(-1)).reshape(target_shape)
+    if np.issubdtype(array.dtype, np.integer):
+        # Rounded half away from zero, as zoom does for integer arrays
+        resized = np.trunc(resized + np.copysign(0.5, resized))
+    return resized.astype(array.dtype, copy=False)
+
+
+def interpolate_to_match(gt, pred, grid_type=DEFAULT_GRID_TYPE):
     if gt.shape == pred.shape:
         return pred
     try:
-        factors = np.array(gt.shape) / np.array(pred.shape)
-        pred_resized = zoom(pred, factors, order=1)
+        pred_resized = regrid(pred, gt.shape, grid_type)
         return pred_resized
     except Exception as e:
         print(f"RuntimeError: Interpolation failed: {e}")
 
 
-def compute_losses(gt, pred):
-    gt_flat = gt.flatten()
-    pred_flat = pred.flatten()
+def assert_all_finite(x):
+    # Same check and messages as the sklearn input validation the metrics used to go through
+    if np.isfinite(x.sum()):
+        return
+    if np.isnan(x).any():
+        raise ValueError("Input contains NaN.")
+    if not np.isfinite(x).all():
+        raise ValueError(f"Input contains infinity or a value too large for {x.dtype!r}.")
+
+
+def get_field_statistics(x, work=None):
+    # Ground truth only quantities of the metrics, with the reductions of compute_losses (work: scratch buffer)
+    work = np.square(x, out=work)
+    mean_square = work.mean()
+    np.subtract(x, x.mean(), out=work)
+    np.square(work, out=work)
+    return {"mean": x.mean(), "mean_square": mean_square, "total_sum_squares": work.sum(),
+            "norm": np.sqrt(np.einsum("i,i->", x, x)), "min": x.min(), "max": x.max()}
+
+
+# A prediction blew up when it has non-finite cells or its max error exceeds this many times the largest ground truth
+# magnitude
+BLOW_UP_FACTOR = 1e3
 
-    mse = mean_squared_error(gt_flat, pred_flat)
-    mae = mean_absolute_error(gt_flat, pred_flat)
+
+def compute_metrics(gt_flat, pred_flat, gt_stats=None):
+    # The metric kernel of compute_losses on finite flat arrays, returns the metrics, the ground truth statistics and
+    # whether a square / norm overflowed
+    residual = np.subtract(gt_flat, pred_flat)
+    work = np.abs(residual)
+    mae = float(work.mean())
+    max_error = float(work.max())
+
+    np.square(residual, out=residual)
+    mse = float(residual.mean())
     rmse = np.sqrt(mse)
-    cosine_sim = cosine_similarity(gt_flat.reshape(1, -1), pred_flat.reshape(1, -1))[0][0]
-    r2 = r2_score(gt_flat, pred_flat)
+    residual_sum = residual.sum()
 
-    # NMSE: Normalized Mean Squared Error
-    nmse = mse / np.mean(gt_flat**2)
+    if gt_stats is None:
+        gt_stats = get_field_statistics(gt_flat, work)
 
-    return mse, mae, rmse, cosine_sim, r2, nmse
+    # NMSE: Normalized Mean Squared Error
+    nmse = mse / gt_stats["mean_square"]
+
+    # R2, with sklearn's force_finite convention for a constant ground truth
+    total_sum = gt_stats["total_sum_squares"]
+    if gt_flat.size < 2:
+        r2 = float("nan")
+    elif residual_sum == 0:
+        r2 = 1.0
+    elif total_sum == 0:
+        r2 = 0.0
+    else:
+        r2 = float(1 - residual_sum / total_sum)
+
+    # Cosine similarity of the normalized vectors (a zero vector stays zero)
+    gt_norm = gt_stats["norm"]
+    pred_norm = np.sqrt(np.einsum("i,i->", pred_flat, pred_flat))
+    np.divide(gt_flat, gt_norm if gt_norm != 0 else 1, out=residual)
+    np.divide(pred_flat, pred_norm if pred_norm != 0 else 1, out=work)
+    cosine_sim = (residual[np.newaxis, :] @ work[:, np.newaxis])[0][0]
+
+    overflow = not np.isfinite([mse, max_error, pred_norm, gt_stats["mean_square"], total_sum, gt_norm]).all()
+    return (mse, mae, rmse, cosine_sim, r2, nmse, max_error), gt_stats, overflow
+
+
+def compute_losses(gt, pred, gt_stats=None):
+    # All the metrics in a few NumPy reductions, bit-identical to the sklearn metrics; gt_stats skips the ground truth
+    # passes, NaN / Inf cells of the prediction are masked
+    # Returns (mse, mae, rmse, cosine_sim, r2, nmse, max_error, finite_fraction, blow_up)
+    gt_flat = gt.reshape(-1)
+    pred_flat = pred.reshape(-1)
+    if gt_flat.size != pred_flat.size:
+        raise ValueError(f"Found input variables with inconsistent numbers of samples: "
+                         f"[{gt_flat.size}, {pred_flat.size}]")
+    if np.iscomplexobj(gt_flat) or np.iscomplexobj(pred_flat):
+        raise ValueError("Complex data not supported")
+    if not np.issubdtype(np.result_type(gt_flat, pred_flat), np.floating):
+        gt_flat = gt_flat.astype(np.float64)
+        pred_flat = pred_flat.astype(np.float64)
+    if gt_stats is None:
+        assert_all_finite(gt_flat)
+
+    # The sum is finite for (almost) every finite prediction, the mask is only built otherwise
+    finite_fraction = 1.0
+    with np.errstate(over="ignore"):
+        prediction_sum = pred_flat.sum()
+    if not np.isfinite(prediction_sum):
+        finite = np.isfinite(pred_flat)
+        finite_fraction = float(finite.mean())
+        if finite_fraction == 0:
+            raise ValueError("Prediction contains no finite values.")
+        if finite_fraction < 1:
+            gt_flat, pred_flat = gt_flat[finite], pred_flat[finite]
+            gt_stats = None
+
+    with np.errstate(over="ignore", invalid="ignore"):
+        metrics, gt_stats, overflow = compute_metrics(gt_flat, pred_flat, gt_stats)
+    mse, mae, rmse, cosine_sim, r2, nmse, max_error = metrics
+    gt_abs_max = max(-gt_stats["min"], gt_stats["max"])
+
+    if overflow:
+        # Squares beyond the float range: the metrics of both arrays divided by their largest magnitude, in float64.
+        # NMSE, R2 and cosine do not depend on the scale, the other metrics are scaled back (the MSE may stay inf)
+        scale = np.float64(max(np.abs(gt_flat).max(), np.abs(pred_flat).max()))
+        metrics, scaled_stats, _ = compute_metrics(gt_flat / scale, pred_flat / scale)
+        mse, mae, rmse, cosine_sim, r2, nmse, max_error = metrics
+        with np.errstate(over="ignore"):
+            mse, rmse = float(mse * scale * scale), rmse * scale
+        mae, max_error = mae * float(scale), max_error * float(scale)
+        gt_abs_max = max(-scaled_stats["min"], scaled_stats["max"]) * scale
+
+    blow_up = finite_fraction < 1 or (gt_abs_max > 0 and max_error > BLOW_UP_FACTOR * gt_abs_max)
+
+    return mse, mae, rmse, cosine_sim, r2, nmse, max_error, finite_fraction, bool(blow_up)
 
 
 def print_summary(results):
@@ -716,42 +2201,194 @@ def print_summary(results):
         print("-" * 40)
 
 
-def compute_errors_gt_pred(common_files, ground_truth_dir, prediction_dir, results):
-    for fname in common_files:
-        try:
-            gt_path = os.path.join(ground_truth_dir, fname)
-            pred_path = os.path.join(prediction_dir, fname)
-            gt = np.load(gt_path)
-            pred = np.load(pred_path)
+class GroundTruthStore:
+    # Ground truth arrays in one memory-mappable file with an index of offsets, shapes, dtypes and statistics,
+    # rebuilt when the .npy files change
+    ALIGNMENT = 64
 
-            if gt.ndim == 1:
-                gt = gt[:, np.newaxis]
-            if pred.ndim == 1:
-                pred = pred[:, np.newaxis]
+    def __init__(self, ground_truth_dir, store_dir):
+        self.ground_truth_dir = ground_truth_dir
+        self.store_dir = store_dir
+        self.index_file = os.path.join(store_dir, "index.json")
+        self.data_file = None
+        self.fields = {}
 
-            pred = interpolate_to_match(gt, pred)
+    def get_source_files(self):
+        return sorted(f for f in os.listdir(self.ground_truth_dir) if f.endswith(".npy"))
 
-            if gt.shape != pred.shape:
-                raise ValueError(f"Shape mismatch after interpolation: {gt.shape} vs {pred.shape}")
+    def get_signature(self):
+        h = hashlib.sha256()
+        for fname in self.get_source_files():
+            stat = os.stat(os.path.join(self.ground_truth_dir, fname))
+            h.update(f"{fname}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return h.hexdigest()
 
-            mse, mae, rmse, cosine_sim, r2, nmse = compute_losses(gt, pred)
+    def load(self):
+        # Open the store, building it first when it is missing or older than the ground truth
+        signature = self.get_signature()
+        try:
+            with open(self.index_file, "r") as f:
+                index = json.load(f)
+            if index["signature"] == signature and os.path.exists(os.path.join(self.store_dir, index["data_file"])):
+                self.data_file, self.fields = index["data_file"], index["fields"]
+                return self
+        except (OSError, ValueError, KeyError):
+            pass
+        self.build(signature)
+        return self
+
+    @staticmethod
+    def compute_statistics(array):
+        # None for the fields compute_losses rejects, converts or rescales (non-finite, complex, integer, huge)
+        if not np.issubdtype(array.dtype, np.floating) or not np.isfinite(array).all():
+            return None
+        flat = array.reshape(-1)
+        with np.errstate(over="ignore"):
+            statistics = get_field_statistics(flat)
+        statistics["variance"] = statistics["total_sum_squares"] / flat.size
+        if not np.isfinite(list(statistics.values())).all():
+            # Overflowing squares: compute_losses takes its scaled float64 path for these fields
+            return None
+        return {name: float(value) for name, value in statistics.items()}
+
+    def build(self, signature):
+        os.makedirs(self.store_dir, exist_ok=True)
+        data_file = f"fields_{signature[:16]}.bin"
+        tmp_file = os.path.join(self.store_dir, f"{data_file}.{os.getpid()}.tmp")
+        fields = {}
+        with open(tmp_file, "wb") as out:
+            for fname in self.get_source_files():
+                try:
+                    array = np.load(os.path.join(self.ground_truth_dir, fname))
+                except Exception as e:
+                    logging.warning(f"Ground truth {fname} not added to the store: {e}")
+                    continue
+                if array.dtype.hasobject or array.size == 0:
+                    continue
+                out.write(b"\0" * (-out.tell() % self.ALIGNMENT))
+                fields[fname] = {"offset": out.tell(), "shape": list(array.shape), "dtype": array.dtype.str,
+                                 "statistics": self.compute_statistics(array)}
+                np.ascontiguousarray(array).tofile(out)
+        os.replace(tmp_file, os.path.join(self.store_dir, data_file))
+
+        tmp_file = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"signature": signature, "data_file": data_file, "fields": fields}, f, indent=2)
+        os.replace(tmp_file, self.index_file)
+        # Data files of older ground truths (a process still mapping one keeps it until it exits)
+        for fname in os.listdir(self.store_dir):
+            if fname.startswith("fields_") and fname.endswith(".bin") and fname != data_file:
+                os.remove(os.path.join(self.store_dir, fname))
+        self.data_file, self.fields = data_file, fields
+        print(f"🗄️ Ground truth store built with {len(fields)} fields in {self.store_dir}")
+
+    def get(self, fname):
+        # (read-only memory map, statistics or None) of a field, (None, None) when it is not in the store
+        field = self.fields.get(fname)
+        if field is None:
+            return None, None
+        dtype = np.dtype(field["dtype"])
+        array = np.memmap(os.path.join(self.store_dir, self.data_file), dtype=dtype, mode="r",
+                          offset=field["offset"], shape=tuple(field["shape"]))
+        statistics = field["statistics"]
+        if statistics is not None:
+            statistics = {name: dtype.type(value) for name, value in statistics.items()}
+        return array, statistics
+
+
+def get_grid_type(fname, grid_types=None):
+    # Grid layout of the task of a <var>_<task>.npy file, given as {task: grid type}
+    task = get_task_name(fname, grid_types) if grid_types else None
+    return grid_types[task] if task is not None else DEFAULT_GRID_TYPE
+
+
+def compare_file(ground_truth_dir, prediction_dir, fname, grid_types=None, store=None):
+    # Comparison record of one file. The arrays are memory-mapped, so only the pages being reduced are resident and a
+    # pool worker holds at most one ground truth / prediction pair at a time. The ground truth comes from the
+    # GroundTruthStore when given, with its precomputed statistics
+    try:
+        gt, gt_stats = store.get(fname) if store is not None else (None, None)
+        if gt is None:
+            gt = np.load(os.path.join(ground_truth_dir, fname), mmap_mode="r")
+        pred = np.load(os.path.join(prediction_dir, fname), mmap_mode="r")
 
-            results[fname] = {
-                "MSE": f"{mse:.3e}",
-                "MAE": f"{mae:.3e}",
-                "RMSE": f"{rmse:.3e}",
-                "CosineSimilarity": f"{cosine_sim:.3f}",
-                "R2": f"{r2:.3f}",
-                "NMSE": f"{nmse:.3f}"
-            }
+        if gt.ndim == 1:
+            gt = gt[:, np.newaxis]
+        if pred.ndim == 1:
+            pred = pred[:, np.newaxis]
 
-            logging.info(
-                f"{fname}: MSE={mse:.3e}, MAE={mae:.3e}, RMSE={rmse:.3e}, Cosine={cosine_sim:.3f}, R2={r2:.3f}, "
-                f"NMSE={nmse:.3f}")
+        pred = interpolate_to_match(gt, pred, get_grid_type(fname, grid_types))
 
-        except Exception as e:
-            results[fname] = {"Error": str(e)}
-            logging.error(f"❌ {fname} failed: {str(e)}")
+        if gt.shape != pred.shape:
+            raise ValueError(f"Shape mismatch after interpolation: {gt.shape} vs {pred.shape}")
+
+        mse, mae, rmse, cosine_sim, r2, nmse, max_error, finite_fraction, blow_up = compute_losses(gt, pred, gt_stats)
+        return {"file": fname, "gt_shape": list(gt.shape), "MSE": float(mse), "MAE": float(mae), "RMSE": float(rmse),
+                "Cosine": float(cosine_sim), "R2": float(r2), "NMSE": float(nmse), "MaxError": max_error,
+                "FiniteFraction": finite_fraction, "BlowUp": blow_up, "error": None}
+
+    except Exception as e:
+        return {"file": fname, "error": str(e)}
+
+
+# Below this many files a task is compared in the calling process, a process pool costs more than it saves
+MIN_FILES_PER_COMPARE_POOL = 8
+
+
+def compare_files(common_files, ground_truth_dir, prediction_dir, max_workers=1, grid_types=None, store=None):
+    # Comparison records of the files, in order. With max_workers > 1 the files of large tasks are spread over
+    # processes started from a fork server (the caller may hold threads, e.g. the log listener, that a plain fork
+    # would copy in an unknown state)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(common_files)))
+    if max_workers == 1 or len(common_files) < MIN_FILES_PER_COMPARE_POOL:
+        for fname in common_files:
+            yield compare_file(ground_truth_dir, prediction_dir, fname, grid_types, store)
+        return
+
+    context = multiprocessing.get_context("forkserver")
+    # The fork server imports this module once, so its workers start without re-importing it
+    context.set_forkserver_preload([__name__])
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        chunksize = max(1, len(common_files) // (4 * max_workers))
+        yield from executor.map(compare_file, itertools.repeat(ground_truth_dir), itertools.repeat(prediction_dir),
+                                common_files, itertools.repeat(grid_types), itertools.repeat(store),
+                                chunksize=chunksize)
+
+
+def compute_errors_gt_pred(common_files, ground_truth_dir, prediction_dir, results, records=None, log=logging,
+                           max_workers=1, grid_types=None, store=None):
+    for record in compare_files(common_files, ground_truth_dir, prediction_dir, max_workers, grid_types, store):
+        fname = record["file"]
+        if record["error"] is not None:
+            results[fname] = {"Error": record["error"]}
+            log.error(f"❌ {fname} failed: {record['error']}")
+            if records is not None:
+                records.append(record)
+            continue
+
+        mse, mae, rmse = record["MSE"], record["MAE"], record["RMSE"]
+        cosine_sim, r2, nmse, max_error = record["Cosine"], record["R2"], record["NMSE"], record["MaxError"]
+        finite_fraction, blow_up = record["FiniteFraction"], record["BlowUp"]
+        results[fname] = {
+            "MSE": f"{mse:.3e}",
+            "MAE": f"{mae:.3e}",
+            "RMSE": f"{rmse:.3e}",
+            "CosineSimilarity": f"{cosine_sim:.3f}",
+            "R2": f"{r2:.3f}",
+            "NMSE": f"{nmse:.3f}",
+            "MaxError": f"{max_error:.3e}",
+            "FiniteFraction": f"{finite_fraction:.3f}",
+            "BlowUp": blow_up
+        }
+
+        log.info(
+            f"{fname}: MSE={mse:.3e}, MAE={mae:.3e}, RMSE={rmse:.3e}, Cosine={cosine_sim:.3f}, R2={r2:.3f}, "
+            f"NMSE={nmse:.3f}, MaxError={max_error:.3e}, FiniteFraction={finite_fraction:.3f}"
+            f"{', blow-up' if blow_up else ''}")
+        if records is not None:
+            records.append(record)
 
 
 def get_common_files(ground_truth_dir, prediction_dir):
@@ -765,7 +2402,8 @@ def get_common_files(ground_truth_dir, prediction_dir):
     return common_files
 
 
-def call_compare_output_mismatch(ground_truth_dir, prediction_dir, log_file):
+def call_compare_output_mismatch(ground_truth_dir, prediction_dir, log_file, files=None, max_workers=1,
+                                 grid_types=None, store=None):
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
     # Clear old logging handlers
@@ -780,17 +2418,26 @@ def call_compare_output_mismatch(ground_truth_dir, prediction_dir, log_file):
     )
     logging.info("====== Starting Comparison ======")
 
-    # === Get common .npy files ===
+    # === Get common .npy files (optionally restricted to the given files) ===
     common_files = get_common_files(ground_truth_dir, prediction_dir)
+    if files is not None:
+        common_files = [f for f in common_files if f in files]
 
     results = {}
+    records = []
 
-    compute_errors_gt_pred(common_files, ground_truth_dir, prediction_dir, results)
+    compute_errors_gt_pred(common_files, ground_truth_dir, prediction_dir, results, records, max_workers=max_workers,
+                           grid_types=grid_types, store=store)
 
     # === Print Summary ===
     print_summary(results)
 
+    # === One JSONL record per compared file, used to build the tables ===
+    records_file = get_records_file(log_file)
+    write_jsonl_records(records_file, records)
+
     print(f"\n🎯 Log saved to: {log_file}")
+    print(f"🎯 Records saved to: {records_file}")
 
 
 def get_problem_name_pred(filename):
@@ -842,41 +2489,114 @@ def call_compare_image_mismatch(save_dir_gt, save_dir_pred, save_csv_path):
     df.to_csv(csv_file, index=False, float_format="%.3e")
 
 
-def call_create_table(compare_results_log_file, save_table_path):
+def get_task_name(filename, task_names):
+    # <var>_<task>.npy -> <task>, the longest matching task name wins (e.g. u_2D_Navier_Stokes_Cavity.npy)
+    matches = [t for t in task_names if filename.endswith(f"_{t}.npy")]
+    return max(matches, key=len) if matches else None
+
+
+def get_task_files(directory, task_names):
+    # {task: sorted <var>_<task>.npy paths} for the arrays in the directory
+    task_files = {task: [] for task in task_names}
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            task = get_task_name(filename, task_names) if filename.endswith(".npy") else None
+            if task is not None:
+                task_files[task].append(os.path.join(directory, filename))
+    return task_files
+
+
+def hash_files(paths):
+    # Content hash of the given files, including their names (so a renamed output changes the hash)
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class EvaluationManifest:
+    # Per-step task fingerprints and records for run_all(incremental=True): unchanged tasks are skipped and their
+    # stored records reused
+    def __init__(self, manifest_file):
+        self.manifest_file = manifest_file
+        self.steps = {}
+        if os.path.exists(manifest_file):
+            try:
+                with open(manifest_file, "r") as f:
+                    self.steps = json.load(f)["steps"]
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable manifest {manifest_file}: {e}")
+
+    def changed_tasks(self, step, fingerprints):
+        entries = self.steps.get(step, {})
+        return [task for task, fingerprint in fingerprints.items()
+                if entries.get(task, {}).get("fingerprint") != fingerprint]
+
+    def update(self, step, fingerprints, records=None):
+        # Record the tasks that were just processed, replacing their previous records
+        entries = self.steps.setdefault(step, {})
+        for task, fingerprint in fingerprints.items():
+            entries[task] = {"fingerprint": fingerprint, "records": (records or {}).get(task, [])}
+
+    def records(self, step, task_names):
+        entries = self.steps.get(step, {})
+        return [record for task in task_names for record in entries.get(task, {}).get("records", [])]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.manifest_file), exist_ok=True)
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump({"steps": self.steps}, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+
+def call_create_table(compare_records_file, save_table_path, execution_records_file=None):
     # === Config ===
-    log_file_path = compare_results_log_file
     output_csv_path = save_table_path
-
-    # === Regex pattern for results line ===
-    pattern = re.compile(
-        r"INFO - ([\w_.\-]+): MSE=([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?), "
-        r"MAE=([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?), "
-        r"RMSE=([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?), "
-        r"Cosine=([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?), "
-        r"R2=([-+]?\d*\.?\d+(?:[eE][-+]?\d+)?)"
-    )
-
-    # === Extract Data ===
-    results = []
-    with open(log_file_path, 'r') as file:
-        for line in file:
-            match = pattern.search(line)
-            if match:
-                results.append({
-                    'Filename': match.group(1),
-                    'MSE': float(match.group(2)),
-                    'MAE': float(match.group(3)),
-                    'RMSE': float(match.group(4)),
-                    'Cosine Similarity': float(match.group(5)),
-                    'R-squared': float(match.group(6)),
-                })
-
-    # === Create DataFrame ===
-    df = pd.DataFrame(results)
+    metric_columns = {
+        'file': 'Filename',
+        'MSE': 'MSE',
+        'MAE': 'MAE',
+        'RMSE': 'RMSE',
+        'Cosine': 'Cosine Similarity',
+        'R2': 'R-squared',
+        'NMSE': 'NMSE',
+        'MaxError': 'Max Error',
+        'FiniteFraction': 'Finite Fraction',
+        'BlowUp': 'Blow-up',
+    }
+
+    # === Load the comparison records, keeping the files that were compared successfully ===
+    records = pd.read_json(compare_records_file, lines=True, dtype=False, precise_float=True)
+    if records.empty or 'MSE' not in records:
+        df = pd.DataFrame(columns=list(metric_columns.values()))
+    else:
+        # reindex: records stored by an older manifest have no max error / finite fraction / blow-up columns
+        df = records[records['error'].isna()].reindex(columns=list(metric_columns)).rename(columns=metric_columns)
+        df = df.reset_index(drop=True)
 
     # Format all float columns to scientific notation with 3 significant digits
-    for col in ['MSE', 'MAE', 'RMSE', 'Cosine Similarity', 'R-squared']:
+    for col in ['MSE', 'MAE', 'RMSE', 'Cosine Similarity', 'R-squared', 'NMSE', 'Max Error']:
         df[col] = df[col].apply(lambda x: f"{x:.3e}")
+    df['Finite Fraction'] = df['Finite Fraction'].apply(lambda x: f"{x:.3f}")
+
+    # === Add the status and resources of the solver that produced each file ===
+    if execution_records_file and os.path.exists(execution_records_file) and not df.empty:
+        execution = pd.read_json(execution_records_file, lines=True, dtype=False, precise_float=True)
+        execution_columns = {
+            'status': 'Status',
+            'wall_time': 'Wall Time [s]',
+            'user_time': 'User CPU [s]',
+            'system_time': 'System CPU [s]',
+            'peak_rss_mb': 'Peak RSS [MB]',
+            'child_processes': 'Child Processes',
+        }
+        execution = execution.reindex(columns=['task'] + list(execution_columns)).rename(columns=execution_columns)
+        df['task'] = df['Filename'].apply(lambda f: get_task_name(f, execution['task']))
+        df = df.merge(execution, on='task', how='left').drop(columns='task')
 
     # === Save to CSV ===
     df.to_csv(output_csv_path, index=False)
@@ -985,11 +2705,13 @@ def plot_2d_diff(gt, pred, file_name, save_dir_gt, save_dir_pred):
     plt.close()
 
 
-def call_save_image_same_dir(save_dir, ground_truth_dir, prediction_dir):
+def call_save_image_same_dir(save_dir, ground_truth_dir, prediction_dir, files=None):
     # === Configuration ===
     os.makedirs(save_dir, exist_ok=True)
     # === Common files (files that exist in both directories) ===
     common_files = get_common_files(ground_truth_dir, prediction_dir)
+    if files is not None:
+        common_files = [f for f in common_files if f in files]
 
     # === Iterate and Plot for Common Files ===
     for file in common_files:
@@ -1013,13 +2735,15 @@ def call_save_image_same_dir(save_dir, ground_truth_dir, prediction_dir):
     print(f"\n🎯 Plotting complete. Images saved to: {save_dir}")
 
 
-def call_save_image_different_dir(ground_truth_dir, prediction_dir, save_dir_gt, save_dir_pred):
+def call_save_image_different_dir(ground_truth_dir, prediction_dir, save_dir_gt, save_dir_pred, files=None):
     # === Configuration ===
     os.makedirs(save_dir_gt, exist_ok=True)
     os.makedirs(save_dir_pred, exist_ok=True)
 
     # === Common files (files that exist in both directories) ===
     common_files = get_common_files(ground_truth_dir, prediction_dir)
+    if files is not None:
+        common_files = [f for f in common_files if f in files]
 
     # === Iterate and Plot for Common Files ===
     for file in common_files:
@@ -1090,9 +2814,12 @@ def scale_nx_ny_nt(folder_path, k):
 
 
 class SolverPostProcessor:
-    def __init__(self, llm_model, prompt_json):
+    def __init__(self, llm_model, prompt_json, max_workers=None, use_cache=False, warm_pool=False, watchdog=None,
+                 capture_outputs=True, grid_types=None):
         self.llm_model = llm_model
         self.prompt_json = prompt_json
+        # Number of solvers executed (and of arrays compared) in parallel (None uses all CPU cores)
+        self.max_workers = max_workers
         self.timestamp = datetime.now().strftime("%H-%M-%S-%f")
         # PDE_Benchmark root
         self.root_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PDE_Benchmark')
@@ -1122,45 +2849,135 @@ class SolverPostProcessor:
         os.makedirs(self.COMPARE_IMAGE_FOLDER, exist_ok=True)
         os.makedirs(self.SOLVER_FOLDER, exist_ok=True)
 
-        self.status_counts = {"pass": 0, "fail": 0}
+        self.status_counts = {"pass": 0, "fail": 0, "diverged": 0}
         self.CONVERGENT_FOLDER = os.path.join(self.root_dir, 'convergent')
         os.makedirs(self.CONVERGENT_FOLDER, exist_ok=True)
-
-
-    def run_all(self, step1=True, step2=True, step3=True, step4=True):
-        if step1:
+        # Reuse the execution results of unchanged solvers
+        self.CACHE_FOLDER = os.path.join(self.root_dir, 'cache/execution')
+        self.execution_cache = ExecutionCache(self.CACHE_FOLDER) if use_cache else None
+        # Fork the solvers from warm interpreters with numpy/scipy/matplotlib already imported
+        self.worker_pool = WarmWorkerPool() if warm_pool else None
+        # Optional DivergenceWatchdog to stop blowing-up solvers early (recorded with the "diverged" status)
+        self.watchdog = watchdog
+        # Intercept the NumPy save calls of the solvers at run time instead of rewriting their np.save paths
+        self.capture_outputs = capture_outputs
+        # {task: "node" | "cell" | "periodic"} layout of the arrays, used to regrid predictions of another resolution
+        # (tasks not listed are node-based)
+        self.grid_types = grid_types or {}
+        # Consolidated ground truth arrays and statistics, shared by the models and the convergent runs
+        self.ground_truth_store_dir = os.path.join(self.root_dir, "cache/ground_truth")
+        # Per-task input hashes of the last run, used by run_all(incremental=True)
+        self.manifest_file = os.path.join(self.root_dir, f"cache/manifest_{llm_model}_{self.prompt_name}.json")
+        # Wall times of previous runs, used to start the longest solvers first
+        self.runtime_history = RuntimeHistory(os.path.join(self.root_dir,
+                                                           f"cache/runtime_history_{llm_model}_{self.prompt_name}.json"))
+
+    def get_ground_truth_store(self):
+        return GroundTruthStore(self.ground_truth_dir, self.ground_truth_store_dir).load()
+
+    def get_task_names(self):
+        if not os.path.isdir(self.generated_solvers_dir):
+            return []
+        return sorted(os.path.splitext(f)[0] for f in os.listdir(self.generated_solvers_dir) if f.endswith(".py"))
+
+    def get_fingerprints(self, step, task_names):
+        # The inputs of each step: the solver source for step 1, the solver and its outputs for step 2, the ground
+        # truth and prediction arrays for steps 3 and 4
+        solvers = {task: os.path.join(self.generated_solvers_dir, f"{task}.py") for task in task_names}
+        predictions = get_task_files(self.prediction_dir, task_names)
+        if step == "post_process":
+            return {task: hash_files([solvers[task]]) for task in task_names}
+        if step == "execute":
+            return {task: hash_files([solvers[task]] + predictions[task]) for task in task_names}
+        ground_truth = get_task_files(self.ground_truth_dir, task_names)
+        return {task: f"{hash_files(ground_truth[task])}:{hash_files(predictions[task])}" for task in task_names}
+
+    def get_changed_tasks(self, manifest, step, task_names):
+        if manifest is None:
+            return task_names
+        changed = manifest.changed_tasks(step, self.get_fingerprints(step, task_names))
+        print(f"♻️ {step}: {len(task_names) - len(changed)} of {len(task_names)} tasks unchanged, skipped")
+        return changed
+
+    def update_manifest(self, manifest, step, changed, task_names, records_file=None, key="task"):
+        # Store the new fingerprints (and records) of the processed tasks, then rewrite the records file with the
+        # records of all the tasks so the tables still cover the unchanged ones
+        if manifest is None:
+            return
+        records = {}
+        if records_file is not None and os.path.exists(records_file):
+            with open(records_file, "r") as f:
+                for line in f:
+                    record = json.loads(line)
+                    task = record["task"] if key == "task" else get_task_name(record[key], task_names)
+                    records.setdefault(task, []).append(record)
+        fingerprints = self.get_fingerprints(step, task_names)
+        manifest.update(step, {task: fingerprints[task] for task in changed}, records)
+        if records_file is not None:
+            write_jsonl_records(records_file, manifest.records(step, task_names))
+        manifest.save()
+
+    def get_task_arrays(self, task_names, changed):
+        # File names of the ground truth arrays that belong to the changed tasks
+        ground_truth = get_task_files(self.ground_truth_dir, task_names)
+        return {os.path.basename(path) for task in changed for path in ground_truth[task]}
+
+    def run_all(self, step1=True, step2=True, step3=True, step4=True, incremental=False):
+        # With incremental=True each step only processes the tasks whose inputs changed since the last run
+        manifest = EvaluationManifest(self.manifest_file) if incremental else None
+        task_names = self.get_task_names()
+        if step1 and not self.capture_outputs:
             # STEP 1:
-            # post process to change the .npy save path to specific path
-            call_post_process(self.generated_solvers_dir, self.save_dir)
+            # post process to change the .npy save path to specific path (not needed when the saves are intercepted)
+            changed = self.get_changed_tasks(manifest, "post_process", task_names)
+            call_post_process(self.generated_solvers_dir, self.save_dir, [f"{task}.py" for task in changed])
+            self.update_manifest(manifest, "post_process", changed, task_names)
         if step2:
             # STEP 2:
             # execute LLM generated python code and save the results to log file
-            call_execute_solver(self.generated_solvers_dir, self.log_file, self.status_counts)
+            changed = self.get_changed_tasks(manifest, "execute", task_names)
+            if changed:
+                call_execute_solver(self.generated_solvers_dir, self.log_file, self.status_counts, self.max_workers,
+                                    self.execution_cache, self.save_dir, self.worker_pool, self.watchdog,
+                                    [f"{task}.py" for task in changed], self.runtime_history, self.capture_outputs)
+            self.update_manifest(manifest, "execute", changed, task_names, get_records_file(self.log_file))
         if step3:
             # STEP 3:
             # compute the numerical errors (MSE, MAE, RMSE, CosineSimilarity, R2) for shape mismatch / match array
-            call_compare_output_mismatch(self.ground_truth_dir, self.prediction_dir, self.compare_results_log_file)
+            changed = self.get_changed_tasks(manifest, "compare", task_names)
+            files = self.get_task_arrays(task_names, changed) if manifest is not None else None
+            call_compare_output_mismatch(self.ground_truth_dir, self.prediction_dir, self.compare_results_log_file,
+                                         files, self.max_workers, self.grid_types, self.get_ground_truth_store())
+            self.update_manifest(manifest, "compare", changed, task_names,
+                                 get_records_file(self.compare_results_log_file), key="file")
             # transfer the numerical errors to tables
-            call_create_table(self.compare_results_log_file, self.save_table_path)
+            call_create_table(get_records_file(self.compare_results_log_file), self.save_table_path,
+                              get_records_file(self.log_file))
         if step4:
             # STEP 4:
             # plot and save the images of gt and pred in different folder
+            changed = self.get_changed_tasks(manifest, "plot", task_names)
+            files = self.get_task_arrays(task_names, changed) if manifest is not None else None
             call_save_image_different_dir(self.ground_truth_dir, self.prediction_dir, self.save_dir_gt,
-                                          self.save_dir_pred)
+                                          self.save_dir_pred, files)
             # compare the images for mismatch shape, change the image to gray image, note the MSE is for pixel not
             # the same with MSE of original images, it works like human eyes (this function is optional)
             call_compare_image_mismatch(self.save_dir_gt, self.save_dir_pred, self.save_csv_path)
             # save the gt and pred images in the same figure, each is sub-figure, this used for human view the images
             # this function is optional
-            call_save_image_same_dir(self.save_image_dir, self.ground_truth_dir, self.prediction_dir)
+            call_save_image_same_dir(self.save_image_dir, self.ground_truth_dir, self.prediction_dir, files)
+            self.update_manifest(manifest, "plot", changed, task_names)
 
 
 class ConvergentTest(SolverPostProcessor):
-    def __init__(self, llm_model, prompt_json):
-        super().__init__(llm_model, prompt_json)
+    def __init__(self, llm_model, prompt_json, max_workers=None, use_cache=False, warm_pool=False, watchdog=None,
+                 capture_outputs=True, grid_types=None):
+        super().__init__(llm_model, prompt_json, max_workers, use_cache, warm_pool, watchdog, capture_outputs,
+                         grid_types)
 
         # Override relevant paths to use the convergent folder
         self.generated_solvers_dir = os.path.join(self.root_dir, f"convergent/{llm_model}/{self.prompt_name}")  # instead of solver/{model}/{prompt}
+        self.source_solvers_dir = os.path.join(self.SOLVER_FOLDER, llm_model, self.prompt_name)
         self.prediction_dir = os.path.join(self.root_dir, f'results/prediction_convergent/{llm_model}/{self.prompt_name}')
         self.save_dir = self.prediction_dir  # where .npy results are saved
 
@@ -1177,6 +2994,11 @@ class ConvergentTest(SolverPostProcessor):
         self.save_table_path = os.path.join(self.root_dir,
                                             f'table/convergent_{llm_model}_{self.prompt_name}_extracted_results_table_{self.timestamp}.csv')
         self.save_image_dir = os.path.join(self.root_dir, f'image/convergent/{llm_model}/{self.prompt_name}')
+        self.manifest_file = os.path.join(self.root_dir,
+                                          f"cache/manifest_convergent_{llm_model}_{self.prompt_name}.json")
+        # The convergent runs use 4x finer grids, so they keep their own runtime history
+        self.runtime_history = RuntimeHistory(
+            os.path.join(self.root_dir, f"cache/runtime_history_convergent_{llm_model}_{self.prompt_name}.json"))
 
         # Make sure any new directories are created
         os.makedirs(self.prediction_dir, exist_ok=True)
@@ -1188,12 +3010,283 @@ class ConvergentTest(SolverPostProcessor):
 
     def run(self):
         # Post-processing for convergent test
-        shutil.copytree(self.SOLVER_FOLDER, self.CONVERGENT_FOLDER, dirs_exist_ok=True)
-        scale_nx_ny_nt(self.CONVERGENT_FOLDER, 4)
-        call_post_process(self.generated_solvers_dir, self.save_dir)
-        call_execute_solver(self.generated_solvers_dir, self.log_file, self.status_counts)
-        call_compare_output_mismatch(self.ground_truth_dir, self.prediction_dir, self.compare_results_log_file)
+        # Only the solvers of this model and prompt: the models of a sweep run in parallel on the same folders
+        shutil.copytree(self.source_solvers_dir, self.generated_solvers_dir, dirs_exist_ok=True)
+        scale_nx_ny_nt(self.generated_solvers_dir, 4)
+        if not self.capture_outputs:
+            call_post_process(self.generated_solvers_dir, self.save_dir)
+        call_execute_solver(self.generated_solvers_dir, self.log_file, self.status_counts, self.max_workers,
+                            self.execution_cache, self.save_dir, self.worker_pool, self.watchdog,
+                            history=self.runtime_history, capture_outputs=self.capture_outputs)
+        call_compare_output_mismatch(self.ground_truth_dir, self.prediction_dir, self.compare_results_log_file,
+                                     max_workers=self.max_workers, grid_types=self.grid_types,
+                                     store=self.get_ground_truth_store())
         # transfer the numerical errors to tables
-        call_create_table(self.compare_results_log_file, self.save_table_path)
+        call_create_table(get_records_file(self.compare_results_log_file), self.save_table_path,
+                          get_records_file(self.log_file))
+
+
+
+
+def get_file_logger(name, log_file):
+    # Logger writing to its own file (not the root logger), with the format used by the other logs
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        logger.addHandler(handler)
+    return logger
+
 
+class GenerationPipeline:
+    # Generate -> execute -> compare -> plot per task through bounded queues, with the settings of the generator and
+    # the post-processor and the same logs, records and table as call_api + run_all
+    def __init__(self, generator, processor, queue_size=4, plot=False):
+        self.generator = generator
+        self.processor = processor
+        self.queue_size = queue_size
+        self.plot = plot
 
+    def run(self):
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        # The queue listener of the generator writes its log and transcript while the stages run
+        with self.generator.logging_run():
+            await self.run_stages()
+
+    async def run_stages(self):
+        generator, processor = self.generator, self.processor
+        logging.info(f"Pipeline for {generator.llm_model}, prompt {generator.prompt_json}, "
+                     f"up to {generator.max_concurrency} tasks generated at once")
+        api_key, client, inference_profile_arn = generator.get_api_configuration()
+        with open(generator.PROMPTS_FILE, "r") as file:
+            pde_prompts = json.load(file)
+        task_names = sorted(pde_prompts["prompts"])
+        save_values = generator.load_save_values()
+        os.makedirs(processor.save_dir, exist_ok=True)
+
+        semaphore = asyncio.Semaphore(generator.max_concurrency)
+        rate_limiter = AsyncRateLimiter(**generator.rate_limits)
+        execute_queue = asyncio.Queue(self.queue_size)
+        compare_queue = asyncio.Queue(self.queue_size)
+        plot_queue = asyncio.Queue(self.queue_size)
+        execution_records, compare_records, compare_results = [], [], {}
+        compare_log = get_file_logger(f"compare.{processor.compare_results_log_file}",
+                                      processor.compare_results_log_file)
+        compare_log.info("====== Starting Comparison ======")
+
+        async def generate(task_name):
+            async with semaphore:
+                script_path, generator.task_tokens_counts[task_name] = await generate_code_async(
+                    generator.llm_model, task_name, pde_prompts["prompts"][task_name], client, generator.temperature,
+                    generator.bedrock_runtime, inference_profile_arn, generator.OUTPUT_FOLDER,
+                    generator.tokens_counts, max_retries=generator.max_retries, pool=generator.worker_pool,
+                    watchdog=generator.watchdog, rate_limiter=rate_limiter, llm_cache=generator.llm_cache,
+                    save_values=save_values.get(task_name), compact_context=generator.compact_context,
+                    stream=generator.stream, logger=generator.logger, transcript=generator.transcript)
+            if script_path is not None:
+                await execute_queue.put(task_name)
+
+        async def execute(log):
+            while (task_name := await execute_queue.get()) is not None:
+                script = f"{task_name}.py"
+                try:
+                    if not processor.capture_outputs:
+                        await asyncio.to_thread(call_post_process, processor.generated_solvers_dir,
+                                                processor.save_dir, [script])
+                    print(f"🔹 Running: {script} ...")
+                    _, result = await asyncio.to_thread(
+                        execute_python_script_cached, os.path.join(processor.generated_solvers_dir, script),
+                        processor.execution_cache, processor.save_dir, pool=processor.worker_pool,
+                        watchdog=processor.watchdog, capture_outputs=processor.capture_outputs)
+                    if isinstance(result, subprocess.TimeoutExpired):
+                        write_execute_error_to_log(log, script, processor.status_counts)
+                    else:
+                        write_execute_results_to_log(log, script, result, processor.status_counts)
+                    record = build_execution_record(script, result)
+                    execution_records.append(record)
+                    if record.get("wall_time") is not None:
+                        processor.runtime_history.update(task_name, record["wall_time"])
+                except Exception as e:
+                    print(f"❌ Pipeline execution of {script} failed: {e}")
+                    logging.error(f"❌ Pipeline execution of {script} failed: {e}")
+                await compare_queue.put(task_name)
+
+        async def compare():
+            ground_truth = get_task_files(processor.ground_truth_dir, task_names)
+            store = await asyncio.to_thread(processor.get_ground_truth_store)
+            while (task_name := await compare_queue.get()) is not None:
+                files = [os.path.basename(path) for path in ground_truth[task_name]
+                         if os.path.exists(os.path.join(processor.prediction_dir, os.path.basename(path)))]
+                await asyncio.to_thread(compute_errors_gt_pred, files, processor.ground_truth_dir,
+                                        processor.prediction_dir, compare_results, compare_records, compare_log,
+                                        grid_types=processor.grid_types, store=store)
+                if self.plot and files:
+                    await plot_queue.put(files)
+
+        async def plot():
+            # matplotlib.pyplot is not thread-safe: a single plotting stage
+            while (files := await plot_queue.get()) is not None:
+                await asyncio.to_thread(call_save_image_different_dir, processor.ground_truth_dir,
+                                        processor.prediction_dir, processor.save_dir_gt, processor.save_dir_pred,
+                                        set(files))
+                await asyncio.to_thread(call_save_image_same_dir, processor.save_image_dir,
+                                        processor.ground_truth_dir, processor.prediction_dir, set(files))
+
+        execute_workers = max(1, processor.max_workers or os.cpu_count() or 1)
+        with open(processor.log_file, "w") as log:
+            log.write("====== Execution Results for Generated Solvers ======\n\n")
+            stages = [asyncio.create_task(execute(log)) for _ in range(execute_workers)]
+            compare_stage = asyncio.create_task(compare())
+            plot_stage = asyncio.create_task(plot())
+
+            # Generate all the tasks, then close each stage once the previous one is drained
+            await asyncio.gather(*(generate(task_name) for task_name in task_names))
+            for _ in stages:
+                await execute_queue.put(None)
+            await asyncio.gather(*stages)
+            await compare_queue.put(None)
+            await compare_stage
+            await plot_queue.put(None)
+            await plot_stage
+            write_execute_summary_to_log(log, processor.status_counts)
+
+        # === Records, logs and table, ordered by task like the step-by-step flow ===
+        processor.runtime_history.save()
+        write_jsonl_records(get_records_file(processor.log_file), sorted(execution_records, key=lambda r: r["task"]))
+        write_jsonl_records(get_records_file(processor.compare_results_log_file),
+                            sorted(compare_records, key=lambda r: r["file"]))
+        print_summary(compare_results)
+        generator.log_token_totals()
+        call_create_table(get_records_file(processor.compare_results_log_file), processor.save_table_path,
+                          get_records_file(processor.log_file))
+        if self.plot:
+            call_compare_image_mismatch(processor.save_dir_gt, processor.save_dir_pred, processor.save_csv_path)
+
+
+def run_model_pipeline(llm_model, prompt_json, progress_queue, output_file, generate=True, post_process=True,
+                       convergent=True, generator_kwargs=None, processor_kwargs=None):
+    # Generation and post-processing of one model in its own sweep process, progress events go to progress_queue
+    def report(stage, state, **info):
+        progress_queue.put({"model": llm_model, "stage": stage, "state": state, **info})
+
+    # A pool process may have run another model before: start from a clean root logger
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+
+    # Console output of this model goes to its own file, the pool process gets its own stdout / stderr back at the
+    # end so the next model it runs does not write into this file
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    saved_fds = (os.dup(1), os.dup(2))
+    with open(output_file, "a") as out:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(out.fileno(), 1)
+        os.dup2(out.fileno(), 2)
+
+    stage = None
+    try:
+        if generate:
+            stage = "generate"
+            report(stage, "started")
+            generator = LLMCodeGenerator(llm_model, prompt_json, **(generator_kwargs or {}))
+            generator.progress = lambda task_name, done, total: report(
+                "generate", "running", done=done, total=total, tokens=dict(generator.tokens_counts))
+            generator.call_api_concurrent()
+            report(stage, "finished", tokens=dict(generator.tokens_counts))
+        if post_process:
+            stage = "post_process"
+            report(stage, "started")
+            processor = SolverPostProcessor(llm_model, prompt_json, **(processor_kwargs or {}))
+            processor.run_all()
+            report(stage, "finished", status_counts=dict(processor.status_counts))
+        if convergent:
+            stage = "convergent"
+            report(stage, "started")
+            convergent_processor = ConvergentTest(llm_model, prompt_json, **(processor_kwargs or {}))
+            convergent_processor.run()
+            report(stage, "finished", status_counts=dict(convergent_processor.status_counts))
+    except Exception as e:
+        report(stage, "failed", error=str(e))
+        raise
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, saved_fd in zip((1, 2), saved_fds):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+
+
+def format_sweep_progress(progress):
+    # One line per model: current stage and state, generated tasks, tokens / cost and solver pass / fail counts
+    lines = []
+    total_cost = 0.0
+    for llm_model, state in progress.items():
+        line = f"  {llm_model:<10} {state.get('stage') or '-':<13} {state.get('state', 'waiting'):<9}"
+        if state.get("total"):
+            line += f" tasks {state['done']}/{state['total']}"
+        tokens = state.get("tokens")
+        if tokens:
+            line += (f" tokens in/out {tokens['total_input_tokens']}/{tokens['total_output_tokens']}"
+                     f" ${tokens['total_cost']:.4f}")
+            total_cost += tokens['total_cost']
+        if state.get("status_counts"):
+            line += f" pass/fail {state['status_counts']['pass']}/{state['status_counts']['fail']}"
+        if state.get("error"):
+            line += f" error: {state['error']}"
+        lines.append(line)
+    return "\n".join(["====== Sweep Progress ======", *lines, f"  Total Estimated Cost: ${total_cost:.4f}"])
+
+
+def run_model_sweep(llm_models, prompt_json, max_parallel_models=None, generate=True, post_process=True,
+                    convergent=True, generator_kwargs=None, processor_kwargs=None):
+    # One process per model, console output in report/sweep_<model>_<prompt>_<timestamp>.out, progress printed here
+    root_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PDE_Benchmark')
+    timestamp = datetime.now().strftime("%H-%M-%S-%f")
+    prompt_name = os.path.splitext(prompt_json)[0]
+    max_parallel_models = max_parallel_models or len(llm_models)
+
+    # The models share the CPU cores when executing their solvers and comparing their arrays: each model process
+    # gets at most its share of the cores, so the pools it creates stay within the machine in total
+    processor_kwargs = dict(processor_kwargs or {})
+    cores_per_model = max(1, (os.cpu_count() or 1) // min(max_parallel_models, len(llm_models)))
+    processor_kwargs["max_workers"] = min(processor_kwargs.get("max_workers") or cores_per_model, cores_per_model)
+
+    progress = {llm_model: {} for llm_model in llm_models}
+    failed = {}
+    context = multiprocessing.get_context("fork")
+    with context.Manager() as manager:
+        progress_queue = manager.Queue()
+        with ProcessPoolExecutor(max_workers=max_parallel_models, mp_context=context) as executor:
+            futures = {}
+            for llm_model in llm_models:
+                output_file = os.path.join(root_dir, f"report/sweep_{llm_model}_{prompt_name}_{timestamp}.out")
+                print(f"🔹 Running: {llm_model} (output in {output_file})")
+                futures[executor.submit(run_model_pipeline, llm_model, prompt_json, progress_queue, output_file,
+                                        generate, post_process, convergent, generator_kwargs,
+                                        processor_kwargs)] = llm_model
+
+            pending = set(futures)
+            while pending or not progress_queue.empty():
+                try:
+                    event = progress_queue.get(timeout=1.0)
+                except queue.Empty:
+                    pending = {future for future in pending if not future.done()}
+                    continue
+                progress[event.pop("model")].update(event)
+                print(format_sweep_progress(progress))
+
+            for future, llm_model in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[llm_model] = str(e)
+
+    print(f"\n🎯 Sweep completed for {len(llm_models) - len(failed)} of {len(llm_models)} models.")
+    for llm_model, error in failed.items():
+        print(f"❌ {llm_model} failed: {error}")
+    return progress